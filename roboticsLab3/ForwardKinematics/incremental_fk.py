@@ -0,0 +1,342 @@
+import math
+
+import numpy as np
+
+# ZJU-I 型机械臂 DH 参数（单位：mm）
+robot_params = {'d1': 230, 'a2': 185, 'a3': 170, 'd4': 23, 'd5': 77, 'd6': 85.5}
+
+
+def mdh_table(dh=None):
+    """
+    ZJU-I 型机械臂 Modified DH 参数表，每行 [alpha(i-1), a(i-1), d(i), offset]
+    与 robotics_Formal.py 中的 T_01 ... T_56 一一对应
+
+    参数:
+        dh: DH 参数字典 (mm)，默认 robot_params；可带 'offset' 键（6 个关节零位偏置，弧度）
+
+    返回:
+        table: (6, 4) 数组
+    """
+    if dh is None:
+        dh = robot_params
+    table = np.array([
+        [0,         0,        dh['d1'], 0],
+        [-np.pi/2,  0,        0,        -np.pi/2],
+        [0,         dh['a2'], 0,        0],
+        [0,         dh['a3'], dh['d4'], np.pi/2],
+        [np.pi/2,   0,        dh['d5'], np.pi/2],
+        [np.pi/2,   0,        dh['d6'], 0],
+    ], dtype=np.float64)
+    if 'offset' in dh:
+        table[:, 3] += dh['offset']
+    return table
+
+
+def link_transform(row, theta):
+    """
+    计算单个连杆的变换矩阵 T_{i-1,i}（单点，用 math 避免小数组开销）
+
+    参数:
+        row: 参数表中的一行 [alpha, a, d, offset]
+        theta: 关节角 (弧度)
+
+    返回:
+        T: 4x4
+    """
+    alpha, a, d, offset = row
+    st, ct = math.sin(theta + offset), math.cos(theta + offset)
+    sa, ca = math.sin(alpha), math.cos(alpha)
+    return np.array([[ct,      -st,      0,   a],
+                     [st * ca, ct * ca, -sa, -sa * d],
+                     [st * sa, ct * sa,  ca,  ca * d],
+                     [0,       0,        0,   1]])
+
+
+def link_transform_batch(row, theta):
+    """
+    批量计算单个连杆的变换矩阵 T_{i-1,i}
+
+    参数:
+        row: 参数表中的一行 [alpha, a, d, offset]
+        theta: 关节角 (N,) (弧度)
+
+    返回:
+        T: (N, 4, 4)
+    """
+    alpha, a, d, offset = row
+    theta = np.asarray(theta, dtype=np.float64).reshape(-1) + offset
+    st, ct = np.sin(theta), np.cos(theta)
+    sa, ca = np.sin(alpha), np.cos(alpha)
+
+    T = np.zeros((len(theta), 4, 4))
+    T[:, 0, 0] = ct
+    T[:, 0, 1] = -st
+    T[:, 0, 3] = a
+    T[:, 1, 0] = st * ca
+    T[:, 1, 1] = ct * ca
+    T[:, 1, 2] = -sa
+    T[:, 1, 3] = -sa * d
+    T[:, 2, 0] = st * sa
+    T[:, 2, 1] = ct * sa
+    T[:, 2, 2] = ca
+    T[:, 2, 3] = ca * d
+    T[:, 3, 3] = 1
+    return T
+
+
+def apply_link_batch(T, row, theta):
+    """
+    批量右乘一个连杆变换：T @ T_{i-1,i}(theta)
+
+    T_{i-1,i} = Rx(alpha) * Tx(a) * Rz(theta + offset) * Tz(d)，常数部分用一次矩阵乘法，
+    Rz 和 Tz 只作用在 T 的第 0、1、3 列上，逐元素计算，不构造 (N, 4, 4) 的连杆矩阵
+
+    参数:
+        T: (N, 4, 4) 或 (4, 4) 当前累积变换
+        row: 参数表中的一行 [alpha, a, d, offset]
+        theta: 关节角 (N,) (弧度)
+
+    返回:
+        T: (N, 4, 4) 新的累积变换
+    """
+    alpha, a, d, offset = row
+    theta = np.asarray(theta, dtype=np.float64).reshape(-1) + offset
+    st, ct = np.sin(theta)[:, None], np.cos(theta)[:, None]
+    sa, ca = np.sin(alpha), np.cos(alpha)
+
+    X = np.array([[1, 0, 0, a],
+                  [0, ca, -sa, 0],
+                  [0, sa, ca, 0],
+                  [0, 0, 0, 1]])
+    if T.ndim == 2:
+        T = np.broadcast_to(T @ X, (len(theta), 4, 4)).copy()
+    else:
+        T = (T.reshape(-1, 4) @ X).reshape(-1, 4, 4)
+
+    x = T[:, :3, 0].copy()
+    y = T[:, :3, 1]
+    T[:, :3, 0] = ct * x + st * y
+    T[:, :3, 1] = ct * y - st * x
+    T[:, :3, 3] += d * T[:, :3, 2]
+    return T
+
+
+def full_fk_batch(q, dh=None):
+    """
+    每次都重新计算整条链 T_01 * T_12 * ... * T_56（作为增量计算的对照）
+
+    参数:
+        q: 关节角度 (N, 6) (弧度)
+        dh: DH 参数字典 (mm)
+
+    返回:
+        T: (N, 4, 4)
+    """
+    q = np.asarray(q, dtype=np.float64).reshape(-1, 6)
+    table = mdh_table(dh)
+    T = link_transform_batch(table[0], q[:, 0])
+    for i in range(1, 6):
+        T = T @ link_transform_batch(table[i], q[:, i])
+    return T
+
+
+def wrist_transform_batch(table, q):
+    """
+    批量计算腕部后缀 T_36 = T_34 * T_45 * T_56 的闭式解（前 3 行）
+
+    三个腕部连杆的 alpha 为 0、pi/2、pi/2（ZJU-I 的结构），展开后每个元素只含 s4, c4, s5, c5, s6, c6，
+    6 次三角函数即可得到整个后缀
+
+    参数:
+        table: Modified DH 参数表（6 行）
+        q: 腕部关节角度 (N, 3) (弧度)
+
+    返回:
+        S: (3, 4, N)，S[:, :, n] 为第 n 组的 T_36[:3]；关节维放在最后，便于与 T_03 做一次矩阵乘法
+    """
+    (_, a3, d4, o4), (_, _, d5, o5), (_, _, d6, o6) = table[3:]
+    t4, t5, t6 = q[:, 0] + o4, q[:, 1] + o5, q[:, 2] + o6
+    s4, c4, s5, c5, s6, c6 = np.sin(t4), np.cos(t4), np.sin(t5), np.cos(t5), np.sin(t6), np.cos(t6)
+    c4c5, s4c5 = c4 * c5, s4 * c5
+
+    S = np.empty((3, 4, len(q)))
+    S[0, 0] = s4 * s6 + c4c5 * c6
+    S[0, 1] = s4 * c6 - c4c5 * s6
+    S[0, 2] = c4 * s5
+    S[0, 3] = a3 + d5 * s4 + d6 * S[0, 2]
+    S[1, 0] = s4c5 * c6 - c4 * s6
+    S[1, 1] = -s4c5 * s6 - c4 * c6
+    S[1, 2] = s4 * s5
+    S[1, 3] = d6 * S[1, 2] - d5 * c4
+    S[2, 0] = s5 * c6
+    S[2, 1] = -s5 * s6
+    S[2, 2] = -c5
+    S[2, 3] = d4 - d6 * c5
+    return S
+
+
+class IncrementalFK:
+    """
+    缓存链前缀 T_00, T_01, ..., T_06 的增量正运动学
+
+    每次调用找到第一个变化超过 tol 的关节 k，只重新计算 T_0k 之后的后缀。
+    点动、遥操作和只调整腕部的场景下，前几个关节不变，T_03 等前缀可直接复用。
+    """
+
+    def __init__(self, dh=None, tol=1e-12):
+        self.table = mdh_table(dh).tolist()
+        self.tol = tol
+        self._q = [math.nan] * 6              # 缓存前缀对应的关节角，nan 表示尚未计算
+        self._prefix = np.zeros((7, 4, 4))    # _prefix[i] = T_0i
+        self._prefix[0] = np.eye(4)
+
+    def _first_changed(self, q):
+        """返回第一个与缓存相差超过 tol 的关节序号，全部相同则返回 len(q)"""
+        for i, qi in enumerate(q):
+            if not abs(qi - self._q[i]) <= self.tol:    # nan 视为已变化
+                return i
+        return len(q)
+
+    def _update_prefix(self, q, stop=6):
+        """更新缓存前缀直到 T_0stop，返回本次重新计算的起始关节序号"""
+        q = q[:stop].tolist()
+        k = self._first_changed(q)
+        for i in range(k, stop):
+            self._prefix[i + 1] = self._prefix[i] @ link_transform(self.table[i], q[i])
+            self._q[i] = q[i]
+        if k < stop:
+            self._q[stop:] = [math.nan] * (6 - stop)    # 后面的前缀已经失效
+        return k
+
+    def fk(self, q):
+        """
+        单组关节角的正运动学
+
+        参数:
+            q: 关节角度 [q1, ..., q6] (弧度)
+
+        返回:
+            T: 4x4 末端位姿
+        """
+        q = np.asarray(q, dtype=np.float64)
+        self._update_prefix(q)
+        return self._prefix[6].copy()
+
+    def fk_batch(self, q):
+        """
+        批量正运动学：所有样本共享的前导关节只算一次前缀，其余关节批量计算后缀
+        适用于只扫描腕部关节 (q4, q5, q6) 的工作空间/姿态扫描：前 3 个关节相同时复用缓存的 T_03，
+        腕部后缀用 wrist_transform_batch 的闭式解，T_03 * T_36 合并为一次 (3, 3) x (3, 4N) 的矩阵乘法。
+        前 3 个关节也在变化时逐连杆累乘，此时应改用 roboticsLab4 中 Jacobbi_Test.forward_kinematics_batch 的整链闭式解
+
+        参数:
+            q: 关节角度 (N, 6) (弧度)
+
+        返回:
+            T: (N, 4, 4)
+        """
+        q = np.asarray(q, dtype=np.float64).reshape(-1, 6)
+        n = len(q)
+
+        # 所有行都与第 1 行相同的前导关节数
+        varies = np.any(np.abs(q - q[0]) > self.tol, axis=0)
+        k = int(np.argmax(varies)) if np.any(varies) else 6
+
+        self._update_prefix(q[0], k)
+        if k == 6:
+            return np.broadcast_to(self._prefix[6], (n, 4, 4)).copy()
+
+        if k < 3:
+            T = self._prefix[k]
+            for i in range(k, 6):
+                T = apply_link_batch(T, self.table[i], q[:, i])
+            return T
+
+        T03 = self._prefix[3]
+        M = (T03[:3, :3] @ wrist_transform_batch(self.table, q[:, 3:]).reshape(3, -1)).reshape(3, 4, n)
+        M[:, 3] += T03[:3, 3, None]
+        T = np.empty((n, 4, 4))
+        T[:, :3] = M.transpose(2, 0, 1)
+        T[:, 3] = (0, 0, 0, 1)
+        return T
+
+
+def verify_incremental_fk(n=200000, seed=0):
+    """
+    验证增量正运动学与整链重算结果一致，并比较腕部扫描和点动场景的耗时
+    腕部扫描的对照为现有最快的批量核 roboticsLab4/Jacobbi_Test.forward_kinematics_batch（整链闭式解）
+
+    参数:
+        n: 腕部扫描样本数
+        seed: 随机种子
+    """
+    import importlib.util
+    import os
+    import time
+
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'roboticsLab4', 'Jacobbi_Test.py')
+    spec = importlib.util.spec_from_file_location('Jacobbi_Test', path)
+    jacobbi = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(jacobbi)
+
+    def best_of(f, repeat=5):
+        times = []
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            f()
+            times.append(time.perf_counter() - t0)
+        return min(times)
+
+    rng = np.random.default_rng(seed)
+    ifk = IncrementalFK()
+
+    # 1. 单点：随机改变后几个关节
+    q = rng.uniform(-np.pi, np.pi, 6)
+    max_diff = 0.0
+    for _ in range(200):
+        k = rng.integers(0, 6)
+        q[k:] = rng.uniform(-np.pi, np.pi, 6 - k)
+        max_diff = max(max_diff, np.max(np.abs(ifk.fk(q) - full_fk_batch(q)[0])))
+
+    # 2. 腕部扫描：前 3 个关节固定；另检验前导关节也在变化时的逐连杆路径
+    q_sweep = np.empty((n, 6))
+    q_sweep[:, :3] = rng.uniform(-np.pi, np.pi, 3)
+    q_sweep[:, 3:] = rng.uniform(-np.pi, np.pi, (n, 3))
+    q_arm = rng.uniform(-np.pi, np.pi, (1000, 6))
+    q_arm[:, 0] = q_sweep[0, 0]
+
+    T_ref = jacobbi.forward_kinematics_batch(q_sweep)
+    max_diff = max(max_diff, np.max(np.abs(ifk.fk_batch(q_sweep) - T_ref)),
+                   np.max(np.abs(ifk.fk_batch(q_arm) - full_fk_batch(q_arm))))
+    t_full = best_of(lambda: jacobbi.forward_kinematics_batch(q_sweep))
+    t_inc = best_of(lambda: ifk.fk_batch(q_sweep))
+
+    # 3. 点动：只有 q6 在变
+    q_jog = np.tile(rng.uniform(-np.pi, np.pi, 6), (2000, 1))
+    q_jog[:, 5] = np.linspace(-np.pi, np.pi, 2000)
+    t0 = time.perf_counter()
+    table = mdh_table().tolist()
+    for qi in q_jog:
+        T = np.eye(4)
+        for i in range(6):
+            T = T @ link_transform(table[i], qi[i])
+    t_jog_full = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for qi in q_jog:
+        ifk.fk(qi)
+    t_jog_inc = time.perf_counter() - t0
+
+    ok = max_diff < 1e-9
+    print(f"增量 vs 整链最大差异: {max_diff:.2e} | {'✓ 通过' if ok else '✗ 失败'}")
+    print(f"腕部扫描 {n} 组 | 整链闭式解: {t_full * 1e3:.1f} ms | 增量: {t_inc * 1e3:.1f} ms | "
+          f"加速 {t_full / t_inc:.1f}x")
+    print(f"点动 2000 次 | 整链: {t_jog_full * 1e3:.1f} ms | 增量: {t_jog_inc * 1e3:.1f} ms | "
+          f"加速 {t_jog_full / t_jog_inc:.1f}x")
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 100)
+    print("ZJU-I 型机械臂增量正运动学验证")
+    print("=" * 100)
+    verify_incremental_fk()
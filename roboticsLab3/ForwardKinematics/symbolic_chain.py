@@ -0,0 +1,228 @@
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import sympy as sp
+from sympy.simplify.fu import TR10i
+
+# 关节角与连杆参数符号，与 robotics_Formal.py 相同
+theta = sp.symbols('theta1:8')
+d1, a2, a3, d4, d5, d6, d7 = sp.symbols('d1 a2 a3 d4 d5 d6 d7')
+
+# ZJU-I 型机械臂 Modified DH 参数表，每行 [alpha(i-1), a(i-1), d(i), offset]，与 incremental_fk.mdh_table 一致
+ZJU_I_MDH = [
+    [0,         0,  d1, 0],
+    [-sp.pi/2,  0,  0,  -sp.pi/2],
+    [0,         a2, 0,  0],
+    [0,         a3, d4, sp.pi/2],
+    [sp.pi/2,   0,  d5, sp.pi/2],
+    [sp.pi/2,   0,  d6, 0],
+]
+
+# 7 轴变体示例：在腕部末端再串联一个与 6 号关节轴垂直的转动关节（冗余腕），用于检验流程的可扩展性
+ZJU_I_7AXIS_MDH = ZJU_I_MDH + [
+    [-sp.pi/2,  0,  d7, 0],
+]
+
+
+def link_transform_symbolic(row, q):
+    """
+    单个连杆的符号变换矩阵 T_{i-1,i} = Rx(alpha) * Tx(a) * Rz(q + offset) * Tz(d)
+
+    参数:
+        row: 参数表中的一行 [alpha, a, d, offset]，alpha、offset 取 pi/2 的整数倍时 sympy 自动化为 0 / ±1 和 sin/cos 互换
+        q: 关节角符号
+
+    返回:
+        T: 4x4 sympy 矩阵
+    """
+    alpha, a, d, offset = row
+    ct, st = sp.cos(q + offset), sp.sin(q + offset)
+    ca, sa = sp.cos(alpha), sp.sin(alpha)
+    return sp.Matrix([[ct,      -st,      0,   a],
+                      [st * ca, ct * ca, -sa, -sa * d],
+                      [st * sa, ct * sa,  ca,  ca * d],
+                      [0,       0,        0,   1]])
+
+
+def chain_transform(table, joints=None):
+    """
+    整条链的变换矩阵 T_0n（只做矩阵乘法，不化简；展开和化简留给逐元素的 simplify_entry）
+
+    参数:
+        table: Modified DH 参数表（n 行）
+        joints: 关节角符号，默认 theta1 ... thetan
+
+    返回:
+        T: 4x4 sympy 矩阵
+    """
+    joints = theta[:len(table)] if joints is None else joints
+    T = sp.eye(4)
+    for row, q in zip(table, joints):
+        T = T * link_transform_symbolic(row, q)
+    return T
+
+
+def simplify_entry(expr):
+    """
+    化简矩阵的单个元素：先完全展开为单项式之和，再反复用和角公式
+    cos(a)cos(b) - sin(a)sin(b) -> cos(a+b) 等（sympy.simplify.fu.TR10i）合并，直到不再变化
+
+    平行轴关节（如 ZJU-I 的 2、3、4 号关节）的乘积项由此合并为 s23、s234 这类和角项，
+    与 analytical_jacobian 中手写的形式相同；不调用通用的 simplify / trigsimp
+
+    参数:
+        expr: sympy 表达式
+
+    返回:
+        expr: 化简后的表达式
+        seconds: 耗时（秒）
+    """
+    t0 = time.perf_counter()
+    expr = sp.expand(expr)
+    while True:
+        collapsed = TR10i(expr)
+        if collapsed == expr:
+            break
+        expr = collapsed
+    return expr, time.perf_counter() - t0
+
+
+def simplify_matrix(T, workers=None):
+    """
+    在进程池中逐元素并行化简变换矩阵，常数元素（最后一行等）直接跳过
+
+    参数:
+        T: sympy 矩阵
+        workers: 进程数，默认 os.cpu_count()；1 时在当前进程中计算
+
+    返回:
+        T_simple: 化简后的矩阵
+        seconds: 与 T 同形状的 numpy 数组，每个元素的化简耗时（秒）
+    """
+    T = sp.Matrix(T)
+    rows, cols = T.shape
+    index = [(i, j) for i in range(rows) for j in range(cols) if T[i, j].free_symbols]
+    exprs = [T[i, j] for i, j in index]
+
+    workers = workers or os.cpu_count() or 1
+    if workers > 1 and len(exprs) > 1:
+        with ProcessPoolExecutor(workers) as pool:
+            results = list(pool.map(simplify_entry, exprs))
+    else:
+        results = [simplify_entry(e) for e in exprs]
+
+    T_simple = T.copy()
+    seconds = np.zeros((rows, cols))
+    for (i, j), (expr, dt) in zip(index, results):
+        T_simple[i, j] = expr
+        seconds[i, j] = dt
+    return T_simple, seconds
+
+
+def short_names(expr, joints=None):
+    """
+    把 sin/cos(关节角之和) 换成 analytical_jacobian 中的简写符号 s1, c1, s23, c234 ...，便于生成代码或写报告
+
+    参数:
+        expr: sympy 表达式
+        joints: 关节角符号，默认 theta1 ... theta7
+
+    返回:
+        expr: 使用简写符号的表达式
+    """
+    joints = theta if joints is None else joints
+    number = {q: re.sub(r'\D', '', q.name) for q in joints}
+    subs = {}
+    for f in expr.atoms(sp.sin, sp.cos):
+        arg = f.args[0]
+        terms = arg.args if arg.is_Add else (arg,)
+        if all(t in number for t in terms):
+            suffix = ''.join(sorted((number[t] for t in terms), key=int))
+            subs[f] = sp.Symbol(('s' if f.func == sp.sin else 'c') + suffix)
+    return expr.xreplace(subs)
+
+
+def print_timing(seconds, title):
+    """逐元素打印化简耗时表（毫秒）"""
+    print(f"{title}（每个元素耗时，ms）")
+    for row in seconds:
+        print("  " + " ".join(f"{v * 1e3:8.1f}" for v in row))
+    print(f"  合计: {np.sum(seconds) * 1e3:.1f} ms | 最慢元素: {np.max(seconds) * 1e3:.1f} ms")
+
+
+def verify_symbolic_chain(workers=None, n=200, seed=0, compare_simplify=True):
+    """
+    验证逐元素化简:
+      1. ZJU-I 化简结果与 incremental_fk 的数值正运动学一致，关键元素与手写闭式解相同
+      2. 7 轴变体的化简结果与未化简的链乘积数值一致
+      3. 与对单个元素调用 sp.simplify 的耗时比较
+
+    参数:
+        workers: 进程数
+        n: 数值检验的随机关节角组数
+        seed: 随机种子
+        compare_simplify: 是否计时 sp.simplify 作对比（只对位置 z 分量一个元素）
+    """
+    from incremental_fk import full_fk_batch
+
+    rng = np.random.default_rng(seed)
+    params = {d1: 230, a2: 185, a3: 170, d4: 23, d5: 77, d6: 85.5, d7: 60}
+
+    # 1. ZJU-I
+    T6 = chain_transform(ZJU_I_MDH)
+    t0 = time.perf_counter()
+    T6s, sec6 = simplify_matrix(T6, workers)
+    wall6 = time.perf_counter() - t0
+
+    q = rng.uniform(-np.pi, np.pi, (n, 6))
+    f6 = sp.lambdify(theta[:6], T6s.subs(params), 'numpy')
+    T_num = np.stack([np.array(f6(*qi), dtype=np.float64) for qi in q])
+    err6 = np.max(np.abs(T_num - full_fk_batch(q)))
+
+    s = {k: sp.Symbol(k) for k in ('s1', 'c1', 's5', 'c5', 's234', 'c234', 's2', 's23')}
+    form_ok = (sp.expand(short_names(T6s[2, 2]) + s['s234'] * s['c5']) == 0 and
+               sp.expand(short_names(T6s[0, 3]) - (
+                   s['c1'] * (a2 * s['s2'] + a3 * s['s23'] + d5 * s['s234'] + d6 * s['c5'] * s['c234'])
+                   - s['s1'] * (d4 + d6 * s['s5']))) == 0)
+
+    # 2. 7 轴变体
+    T7 = chain_transform(ZJU_I_7AXIS_MDH)
+    t0 = time.perf_counter()
+    T7s, sec7 = simplify_matrix(T7, workers)
+    wall7 = time.perf_counter() - t0
+
+    q7 = rng.uniform(-np.pi, np.pi, (n, 7))
+    f7 = sp.lambdify(theta, T7s.subs(params), 'numpy')
+    f7_raw = sp.lambdify(theta, T7.subs(params), 'numpy')
+    err7 = max(np.max(np.abs(np.array(f7(*qi), dtype=np.float64) - np.array(f7_raw(*qi), dtype=np.float64)))
+               for qi in q7)
+    ops_raw = sum(sp.count_ops(sp.expand(e)) for e in T7)
+    ops_simple = sum(sp.count_ops(e) for e in T7s)
+
+    ok = err6 < 1e-9 and err7 < 1e-9 and form_ok
+    print_timing(sec6, "ZJU-I T_06")
+    print(f"  并行总耗时: {wall6 * 1e3:.1f} ms | 与数值正运动学最大差异: {err6:.2e} | 与手写闭式解一致: {form_ok}")
+    print(f"  T_06[0, 3] = {short_names(T6s[0, 3])}")
+    print_timing(sec7, "7 轴变体 T_07")
+    print(f"  并行总耗时: {wall7 * 1e3:.1f} ms | 与未化简乘积最大差异: {err7:.2e} | "
+          f"运算数 {ops_raw} -> {ops_simple}")
+
+    if compare_simplify:
+        entry = sp.expand(T6[2, 3])
+        t0 = time.perf_counter()
+        sp.simplify(entry)
+        t_simplify = time.perf_counter() - t0
+        print(f"  T_06[2, 3] | sp.simplify: {t_simplify * 1e3:.1f} ms | simplify_entry: {sec6[2, 3] * 1e3:.1f} ms")
+
+    print(f"{'✓ 通过' if ok else '✗ 失败'}")
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 100)
+    print("ZJU-I 型机械臂变换矩阵逐元素并行符号化简")
+    print("=" * 100)
+    verify_symbolic_chain()
@@ -0,0 +1,272 @@
+import numpy as np
+
+# 位姿表示格式（每行一个位姿）:
+#   "euler":  (N, 6)    X, Y, Z, r, p, y   —— X'Y'Z' 欧拉角，R = Rx(r) @ Ry(p) @ Rz(y)
+#   "quat":   (N, 7)    X, Y, Z, qw, qx, qy, qz   —— 四元数标量在前，输入无需归一化
+#   "matrix": (N, 4, 4) 齐次变换矩阵
+POSE_SHAPES = {"euler": (-1, 6), "quat": (-1, 7), "matrix": (-1, 4, 4)}
+
+
+def gimbal_lock_tol(dtype):
+    """
+    万向节锁判定阈值：cos(beta) = hypot(r11, r12) 小于该值时令 gamma = 0
+    不按锁定处理时 alpha、gamma 的误差约 eps / cos(beta)，按锁定处理时重建误差约 cos(beta)，
+    两者在 sqrt(eps) 处相当（float64 约 1.5e-8，float32 约 3.5e-4）
+    :param dtype: 计算精度
+    :return: 阈值
+    """
+    return float(np.sqrt(np.finfo(dtype).eps))
+
+
+def euler_to_matrix_batch(rpy, dtype=np.float64, out=None):
+    """
+    批量计算 X'Y'Z' 欧拉角对应的旋转矩阵（逐元素写入，不构造三个中间矩阵）
+    :param rpy: (N, 3) 欧拉角 r, p, y（弧度）
+    :param dtype: 计算精度
+    :param out: 可选的 (N, 3, 3) 输出数组
+    :return: (N, 3, 3) 旋转矩阵
+    """
+    rpy = np.asarray(rpy, dtype=dtype).reshape(-1, 3)
+    sr, cr = np.sin(rpy[:, 0]), np.cos(rpy[:, 0])
+    sp, cp = np.sin(rpy[:, 1]), np.cos(rpy[:, 1])
+    sy, cy = np.sin(rpy[:, 2]), np.cos(rpy[:, 2])
+
+    R = np.empty((len(rpy), 3, 3), dtype=dtype) if out is None else out
+    np.multiply(cp, cy, out=R[:, 0, 0])
+    np.multiply(-cp, sy, out=R[:, 0, 1])
+    R[:, 0, 2] = sp
+    np.multiply(-sr, cp, out=R[:, 1, 2])
+    np.multiply(cr, cp, out=R[:, 2, 2])
+
+    # 第 2、3 行的前两列共用 sp * cy、sp * sy
+    spcy = sp * cy
+    spsy = sp * sy
+    R[:, 1, 0] = sr * spcy + cr * sy
+    R[:, 1, 1] = cr * cy - sr * spsy
+    R[:, 2, 0] = sr * sy - cr * spcy
+    R[:, 2, 1] = cr * spsy + sr * cy
+    return R
+
+
+def _euler_from_entries(r11, r12, r13, r21, r22, r23, r33, out):
+    """由旋转矩阵的 7 个元素提取 X'Y'Z' 欧拉角，写入 out (N, 3)"""
+    # beta 用 atan2 而不是 asin，|r13| 接近 1 时精度更高
+    cos_beta = np.hypot(r11, r12)
+    np.arctan2(r13, cos_beta, out=out[:, 1])
+    np.arctan2(-r23, r33, out=out[:, 0])
+    np.arctan2(-r12, r11, out=out[:, 2])
+
+    # 万向节锁：alpha 与 gamma 耦合，只有 alpha ± gamma 可确定，取 gamma = 0
+    # 按 cos(beta) 判定：|r13| 与 1 的差在 float32 下无法分辨（1 - 1e-12 会舍入为 1.0）
+    lock = cos_beta < gimbal_lock_tol(out.dtype)
+    if np.any(lock):
+        sgn = np.sign(r13[lock])
+        out[lock, 0] = np.arctan2(sgn * r21[lock], r22[lock])
+        out[lock, 1] = sgn * np.pi / 2
+        out[lock, 2] = 0
+    return out
+
+
+def matrix_to_euler_batch(R, out=None):
+    """
+    批量从旋转矩阵提取 X'Y'Z' 欧拉角（与 robotics_Formal.py 的提取公式一致，万向节锁时 gamma = 0）
+    :param R: (N, 3, 3) 旋转矩阵（或 (N, 4, 4) 齐次矩阵）
+    :param out: 可选的 (N, 3) 输出数组
+    :return: (N, 3) 欧拉角 alpha, beta, gamma（弧度）
+    """
+    R = np.asarray(R)
+    if R.ndim == 2:
+        R = R[None]
+    if out is None:
+        out = np.empty((len(R), 3), dtype=R.dtype)
+    return _euler_from_entries(R[:, 0, 0], R[:, 0, 1], R[:, 0, 2], R[:, 1, 0], R[:, 1, 1], R[:, 1, 2],
+                               R[:, 2, 2], out)
+
+
+def quat_to_matrix_batch(quat, dtype=np.float64, out=None):
+    """
+    批量计算四元数对应的旋转矩阵
+    :param quat: (N, 4) 四元数 qw, qx, qy, qz，不要求已归一化
+    :param dtype: 计算精度
+    :param out: 可选的 (N, 3, 3) 输出数组
+    :return: (N, 3, 3) 旋转矩阵
+    """
+    quat = np.asarray(quat, dtype=dtype).reshape(-1, 4)
+    w, x, y, z = quat[:, 0], quat[:, 1], quat[:, 2], quat[:, 3]
+    s = 2 / np.sum(quat * quat, axis=1)    # 同时完成归一化
+
+    R = np.empty((len(quat), 3, 3), dtype=dtype) if out is None else out
+    xs, ys, zs = x * s, y * s, z * s
+    wx, wy, wz = w * xs, w * ys, w * zs
+    xx, xy, xz = x * xs, x * ys, x * zs
+    yy, yz, zz = y * ys, y * zs, z * zs
+
+    R[:, 0, 0] = 1 - (yy + zz)
+    R[:, 0, 1] = xy - wz
+    R[:, 0, 2] = xz + wy
+    R[:, 1, 0] = xy + wz
+    R[:, 1, 1] = 1 - (xx + zz)
+    R[:, 1, 2] = yz - wx
+    R[:, 2, 0] = xz - wy
+    R[:, 2, 1] = yz + wx
+    R[:, 2, 2] = 1 - (xx + yy)
+    return R
+
+
+def matrix_to_quat_batch(R, out=None):
+    """
+    批量从旋转矩阵计算四元数（Shepperd 方法：按迹和对角元中最大者分四种情况，避免除以小数）
+    :param R: (N, 3, 3) 旋转矩阵（或 (N, 4, 4) 齐次矩阵）
+    :param out: 可选的 (N, 4) 输出数组
+    :return: (N, 4) 单位四元数 qw, qx, qy, qz，qw >= 0
+    """
+    R = np.asarray(R)
+    if R.ndim == 2:
+        R = R[None]
+    r11, r22, r33 = R[:, 0, 0], R[:, 1, 1], R[:, 2, 2]
+    if out is None:
+        out = np.empty((len(R), 4), dtype=R.dtype)
+
+    # 0: 迹最大，1~3: 对应对角元最大
+    case = np.argmax(np.stack([r11 + r22 + r33, r11, r22, r33], axis=1), axis=1)
+
+    m = case == 0
+    t = np.sqrt(1 + r11[m] + r22[m] + r33[m]) * 2
+    out[m, 0] = 0.25 * t
+    out[m, 1] = (R[m, 2, 1] - R[m, 1, 2]) / t
+    out[m, 2] = (R[m, 0, 2] - R[m, 2, 0]) / t
+    out[m, 3] = (R[m, 1, 0] - R[m, 0, 1]) / t
+
+    m = case == 1
+    t = np.sqrt(1 + r11[m] - r22[m] - r33[m]) * 2
+    out[m, 0] = (R[m, 2, 1] - R[m, 1, 2]) / t
+    out[m, 1] = 0.25 * t
+    out[m, 2] = (R[m, 0, 1] + R[m, 1, 0]) / t
+    out[m, 3] = (R[m, 0, 2] + R[m, 2, 0]) / t
+
+    m = case == 2
+    t = np.sqrt(1 - r11[m] + r22[m] - r33[m]) * 2
+    out[m, 0] = (R[m, 0, 2] - R[m, 2, 0]) / t
+    out[m, 1] = (R[m, 0, 1] + R[m, 1, 0]) / t
+    out[m, 2] = 0.25 * t
+    out[m, 3] = (R[m, 1, 2] + R[m, 2, 1]) / t
+
+    m = case == 3
+    t = np.sqrt(1 - r11[m] - r22[m] + r33[m]) * 2
+    out[m, 0] = (R[m, 1, 0] - R[m, 0, 1]) / t
+    out[m, 1] = (R[m, 0, 2] + R[m, 2, 0]) / t
+    out[m, 2] = (R[m, 1, 2] + R[m, 2, 1]) / t
+    out[m, 3] = 0.25 * t
+
+    out[out[:, 0] < 0] *= -1
+    return out
+
+
+def quat_to_euler_batch(quat, dtype=np.float64, out=None):
+    """
+    批量从四元数直接计算 X'Y'Z' 欧拉角，只计算提取所需的 7 个矩阵元素
+    :param quat: (N, 4) 四元数 qw, qx, qy, qz，不要求已归一化
+    :param dtype: 计算精度
+    :param out: 可选的 (N, 3) 输出数组
+    :return: (N, 3) 欧拉角（弧度）
+    """
+    quat = np.asarray(quat, dtype=dtype).reshape(-1, 4)
+    w, x, y, z = quat[:, 0], quat[:, 1], quat[:, 2], quat[:, 3]
+    s = 2 / np.sum(quat * quat, axis=1)
+    if out is None:
+        out = np.empty((len(quat), 3), dtype=dtype)
+    return _euler_from_entries(1 - s * (y * y + z * z), s * (x * y - w * z), s * (x * z + w * y),
+                               s * (x * y + w * z), 1 - s * (x * x + z * z), s * (y * z - w * x),
+                               1 - s * (x * x + y * y), out)
+
+
+def pose_to_rp_batch(poses, pose_format="euler", dtype=np.float64):
+    """
+    把任意格式的位姿转换为 (旋转矩阵, 位置)
+    :param poses: 见 POSE_SHAPES
+    :param pose_format: "euler" / "quat" / "matrix"
+    :param dtype: 计算精度
+    :return: R (N, 3, 3)，p (N, 3)
+    """
+    if pose_format not in POSE_SHAPES:
+        raise ValueError("pose_format must be one of %s" % (tuple(POSE_SHAPES),))
+    poses = np.asarray(poses).reshape(POSE_SHAPES[pose_format])
+    if pose_format == "euler":
+        return euler_to_matrix_batch(poses[:, 3:], dtype), poses[:, :3].astype(dtype)
+    if pose_format == "quat":
+        return quat_to_matrix_batch(poses[:, 3:], dtype), poses[:, :3].astype(dtype)
+    return poses[:, :3, :3].astype(dtype), poses[:, :3, 3].astype(dtype)
+
+
+def matrix_to_pose_batch(T, pose_format="euler"):
+    """
+    把齐次变换矩阵转换为指定格式的位姿
+    :param T: (N, 4, 4) 齐次变换矩阵
+    :param pose_format: "euler" / "quat" / "matrix"
+    :return: 见 POSE_SHAPES
+    """
+    if pose_format not in POSE_SHAPES:
+        raise ValueError("pose_format must be one of %s" % (tuple(POSE_SHAPES),))
+    T = np.asarray(T).reshape(-1, 4, 4)
+    if pose_format == "matrix":
+        return T
+    if pose_format == "euler":
+        out = np.empty((len(T), 6), dtype=T.dtype)
+        out[:, :3] = T[:, :3, 3]
+        matrix_to_euler_batch(T, out=out[:, 3:])
+    else:
+        out = np.empty((len(T), 7), dtype=T.dtype)
+        out[:, :3] = T[:, :3, 3]
+        matrix_to_quat_batch(T, out=out[:, 3:])
+    return out
+
+
+def verify_pose_convert(n=200000, seed=0):
+    """
+    验证各表示之间的往返转换，并单独检查万向节锁附近的欧拉角
+    :param n: 随机位姿数
+    :param seed: 随机种子
+    """
+    import time
+
+    rng = np.random.default_rng(seed)
+    quat = rng.normal(size=(n, 4))
+    R = quat_to_matrix_batch(quat)
+
+    orth_err = np.max(np.abs(R @ R.transpose(0, 2, 1) - np.eye(3)))
+    q_back = matrix_to_quat_batch(R)
+    R_q = quat_to_matrix_batch(q_back)
+    R_e = euler_to_matrix_batch(matrix_to_euler_batch(R))
+    R_qe = euler_to_matrix_batch(quat_to_euler_batch(quat))
+
+    # 万向节锁附近：beta = ±pi/2 + 极小扰动
+    lock = rng.uniform(-np.pi, np.pi, (1000, 3))
+    lock[:, 1] = np.where(rng.random(1000) < 0.5, 1, -1) * np.pi / 2 + rng.normal(0, 1e-9, 1000)
+    R_lock = euler_to_matrix_batch(lock)
+    lock_err = np.max(np.abs(euler_to_matrix_batch(matrix_to_euler_batch(R_lock)) - R_lock))
+
+    # float32 万向节锁：经四元数往返后 |r13| 的舍入误差远大于 float64 的判定余量
+    R_lock32 = euler_to_matrix_batch(lock, np.float32)
+    quat_lock32 = matrix_to_quat_batch(R_lock32)
+    lock32_err = max(
+        np.max(np.abs(euler_to_matrix_batch(quat_to_euler_batch(quat_lock32, np.float32), np.float32) - R_lock32)),
+        np.max(np.abs(euler_to_matrix_batch(matrix_to_euler_batch(R_lock32), np.float32) - R_lock32)))
+
+    err = max(np.max(np.abs(R_q - R)), np.max(np.abs(R_e - R)), np.max(np.abs(R_qe - R)))
+    ok = orth_err < 1e-12 and err < 1e-12 and lock_err < 1e-8 and lock32_err < 1e-3
+
+    t0 = time.perf_counter()
+    quat_to_euler_batch(quat)
+    t_batch = time.perf_counter() - t0
+
+    print("  orthogonality: %.2e | round trip: %.2e | gimbal lock: %.2e | gimbal lock (float32): %.2e | %s"
+          % (orth_err, err, lock_err, lock32_err, "PASS" if ok else "FAIL"))
+    print("  %d quaternion -> euler conversions: %.1f ms" % (n, t_batch * 1e3))
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 60)
+    print("位姿表示转换验证")
+    print("=" * 60)
+    verify_pose_convert()
@@ -1,8 +1,26 @@
 import numpy as np
 
+from pose_convert import pose_to_rp_batch, POSE_SHAPES
+
+# solve_one_pose 的 12 个分支顺序：8 个一般分支 (sgn1, sgn2, sgn3)，4 个 theta_3=0 分支 (sgn3 记为 0)
+_BRANCH_SIGNS = np.array([[-1, -1, -1], [-1, -1, 1], [-1, 1, -1], [-1, 1, 1],
+                          [1, -1, -1], [1, -1, 1], [1, 1, -1], [1, 1, 1],
+                          [-1, -1, 0], [-1, 1, 0], [1, -1, 0], [1, 1, 0]])
+
+# 低精度求解时，|cos(theta_5)| 或 |cos_theta3| 距奇异阈值小于该值的位姿用 float64 重新求解
+SINGULAR_REFINE_TOL = 1e-3
+
+# float32 批量求解相对 float64 的关节角误差上界（rad，误差估计超出该值的位姿已由 float64 重新求解）
+FLOAT32_IK_TOL = 1e-3
+
+# 低精度误差估计的安全系数：估计值乘以该系数后超过 FLOAT32_IK_TOL，或解距关节限位、去重阈值小于该估计时重新求解
+REFINE_ERROR_FACTOR = 4.0
+
+
 class IKSolver:
-    def __init__(self, end_lists, joint_limits_deg=None):
+    def __init__(self, end_lists, joint_limits_deg=None, dh=None, pose_format="euler"):
         self.end_lists = end_lists
+        self.pose_format = pose_format    # end_lists 的位姿格式，见 pose_convert.POSE_SHAPES
         # 默认关节限位（度），可以根据实际机械臂修改
         if joint_limits_deg is None:
             joint_limits_deg = np.array([
@@ -18,6 +36,12 @@ class IKSolver:
         # D-H参数
         self.a = [0, 0, 0.185, 0.170, 0, 0]
         self.d = [0.230, 0, 0, 0.023, 0.077, 0.0855]
+        self.offset = np.zeros(6)
+        if dh is not None:
+            # 标定后的模型（见 roboticsLab4/calibration.py），长度单位 mm，换算为 m
+            self.a = [0, 0, dh['a2'] / 1000, dh['a3'] / 1000, 0, 0]
+            self.d = [dh['d1'] / 1000, 0, 0, dh['d4'] / 1000, dh['d5'] / 1000, dh['d6'] / 1000]
+            self.offset = np.asarray(dh.get('offset', np.zeros(6)), dtype=np.float64)
 
     def is_within_limits(self, th):
         """检查关节角度是否在限位内"""
@@ -26,8 +50,13 @@ class IKSolver:
                 return False
         return True
 
-    def solve_one_pose(self, X, Y, Z, r, p, y):
-        """计算单个目标位姿的所有可行解"""
+    def solve_one_pose(self, *pose, pose_format="euler"):
+        """
+        计算单个目标位姿的所有可行解
+        :param pose: 目标位姿，可逐个给出 X, Y, Z, r, p, y，也可以给出一个数组（四元数 7 个数、齐次矩阵 4x4）
+        :param pose_format: 位姿格式 "euler" / "quat" / "matrix"，见 pose_convert.POSE_SHAPES
+        :return: 可行解列表
+        """
         sgn_lists = [[-1, -1, -1], [-1, -1, 1], [-1, 1, -1], [-1, 1, 1], 
                      [1, -1, -1], [1, -1, 1], [1, 1, -1], [1, 1, 1]]
         
@@ -35,18 +64,9 @@ class IKSolver:
         a = self.a
         d = self.d
         
-        T_ = np.array([[X], [Y], [Z]])
-        red = np.array([0, 0, 0, 1])
-
-        R = np.array([[1, 0, 0],[0, np.cos(r), -np.sin(r)],[0, np.sin(r), np.cos(r)]]) @ \
-            np.array([[np.cos(p), 0, np.sin(p)],[0, 1, 0],[-np.sin(p), 0, np.cos(p)]]) @ \
-            np.array([[np.cos(y), -np.sin(y), 0], [np.sin(y), np.cos(y), 0],[0, 0, 1]])
-        T = np.hstack([R, T_])
-        T = np.vstack([T, red])
-
-        r11, r12, r13, px = T[0, :]
-        r21, r22, r23, py = T[1, :]
-        r31, r32, r33, pz = T[2, :]
+        R, position = pose_to_rp_batch(np.asarray(pose, dtype=np.float64), pose_format)
+        (r11, r12, r13), (r21, r22, r23), (r31, r32, r33) = R[0]
+        px, py, pz = position[0]
 
         # 主循环
         for sgn1, sgn2, sgn3 in sgn_lists:
@@ -96,7 +116,7 @@ class IKSolver:
                 sin_theta4 = np.clip(sin_theta4, -1, 1)
                 theta_4 = np.arcsin(sin_theta4) - theta_2 - theta_3
 
-            th = np.array([theta_1, theta_2, theta_3, theta_4, theta_5, theta_6])
+            th = np.array([theta_1, theta_2, theta_3, theta_4, theta_5, theta_6]) - self.offset
 
             # 归一化到 [-pi, pi]
             th_ = th < -np.pi
@@ -159,7 +179,7 @@ class IKSolver:
                 sin_theta4 = np.clip(sin_theta4, -1, 1)
                 theta_4 = np.arcsin(sin_theta4) - theta_2
             
-            th = np.array([theta_1, theta_2, theta_3, theta_4, theta_5, theta_6])
+            th = np.array([theta_1, theta_2, theta_3, theta_4, theta_5, theta_6]) - self.offset
             th_ = th < -np.pi
             th[th_] += np.pi * 2
             th_ = th > np.pi
@@ -181,20 +201,236 @@ class IKSolver:
         
         return valid_solutions
 
-    def solve(self, print_all=False, continuous_with_positive_theta5=False):
+    def solve_batch(self, poses, dtype=np.float64, refine=True, pose_format="euler"):
+        """
+        批量求解 N 个目标位姿的全部 12 个分支（8 个一般分支 + 4 个 theta_3=0 分支）
+        float64 下的有效解与 solve_one_pose 逐点结果一致（顺序、去重规则相同）
+
+        float32 误差上界（相对 float64，按 2pi 取模）：关节角 < FLOAT32_IK_TOL rad，有效分支与 float64 相同
+        cos_theta3 接近 ±1、|cos(theta_5)| 较小、sin_theta4 / sin_theta6 接近 ±1 时误差会被放大，
+        解或分支判定（判别式、关节限位、去重）可能受影响的位姿由核函数按误差估计标出，
+        refine=True 时这些位姿自动用 float64 重新求解
+        :param poses: 目标位姿，默认 (N, 6) 数组，每行为 X, Y, Z, r, p, y
+        :param dtype: 计算与存储精度，np.float32 可将内存与带宽减半
+        :param refine: 是否对奇异阈值附近的位姿用 float64 重新求解
+        :param pose_format: 位姿格式 "euler" / "quat" / "matrix"，见 pose_convert.POSE_SHAPES
+        :return: sols (N, 12, 6)，无效分支为 nan；valid (N, 12) 布尔掩码
+        """
+        poses = np.asarray(poses).reshape(POSE_SHAPES[pose_format])
+        R, p = pose_to_rp_batch(poses, pose_format, dtype)
+        sols, valid, near_singular = self._solve_batch_kernel(R, p, dtype)
+
+        if refine and dtype != np.float64 and np.any(near_singular):
+            idx = np.nonzero(near_singular)[0]
+            R64, p64 = pose_to_rp_batch(poses[idx], pose_format, np.float64)
+            sols64, valid64, _ = self._solve_batch_kernel(R64, p64, np.float64)
+            sols[idx] = sols64
+            valid[idx] = valid64
+
+        return sols, valid
+
+    def _solve_batch_kernel(self, R, p, dtype):
+        """solve_batch 的向量化核心，逐分支步骤与 solve_one_pose 相同，中间量按 (12 分支, N) 排列"""
+        a = self.a
+        d = self.d
+        n = len(p)
+
+        r11, r12, r13 = R[:, 0, 0], R[:, 0, 1], R[:, 0, 2]
+        r21, r22, r23 = R[:, 1, 0], R[:, 1, 1], R[:, 1, 2]
+        r31, r32, r33 = R[:, 2, 0], R[:, 2, 1], R[:, 2, 2]
+        px, py, pz = p[:, 0], p[:, 1], p[:, 2]
+
+        sgn1 = _BRANCH_SIGNS[:, 0, None].astype(dtype)
+        sgn2 = _BRANCH_SIGNS[:, 1, None].astype(dtype)
+        sgn3 = _BRANCH_SIGNS[:, 2, None].astype(dtype)
+        general = _BRANCH_SIGNS[:, 2, None] != 0
+
+        # step1: solve theta_1, theta_5, theta_6
+        A = d[5] * r13 - px
+        B = d[5] * r23 - py
+        discriminant = A**2 + B**2 - d[3]**2
+        valid = np.broadcast_to(discriminant >= 0, (12, n)).copy()
+
+        theta_1 = np.arctan2(B, A) + np.arctan2(d[3], sgn1 * np.sqrt(np.maximum(discriminant, 0)))
+        s1, c1 = np.sin(theta_1), np.cos(theta_1)
+
+        sin_theta5 = r23 * c1 - r13 * s1
+        valid &= general | (np.abs(sin_theta5) <= 1 + 1e-6)
+        step1_valid = valid.copy()
+        theta_5 = sgn2 * np.arcsin(np.clip(sin_theta5, -1, 1))
+        c5 = np.cos(theta_5)
+        wrist_singular = np.abs(c5) < 1e-6
+        c5_safe = np.where(wrist_singular, 1, c5)
+
+        sin_theta6 = (s1 * r12 - c1 * r22) / c5_safe
+        theta_6 = np.where(wrist_singular, 0, np.arcsin(np.clip(sin_theta6, -1, 1)))
+        s6, c6 = np.sin(theta_6), np.cos(theta_6)
+
+        # step2: solve theta_2, theta_3
+        M = px * c1 + py * s1 - d[5] * (r13 * c1 + r23 * s1) - \
+            d[4] * (r21 * s1 * s6 + r12 * c1 * c6 + r11 * c1 * s6 + r22 * c6 * s1)
+        N = pz - d[0] - d[5] * r33 - d[4] * (r32 * c6 + r31 * s6)
+        dist_sq = M**2 + N**2
+
+        cos_theta3 = (dist_sq - a[2]**2 - a[3]**2) / (2 * a[2] * a[3])
+        valid &= ~general | ((cos_theta3 <= 1 + 1e-6) & (cos_theta3 >= -1 - 1e-6))
+        theta_3 = sgn3 * np.arccos(np.clip(cos_theta3, -1, 1))
+
+        k1 = a[2] + a[3] * np.cos(theta_3)
+        k2 = a[3] * np.sin(theta_3)
+        theta_2 = np.arctan2(M, N) - np.arctan2(k2, k1)
+
+        # theta_3 = 0 分支：要求腕心距离恰好为 a2 + a3
+        valid &= general | (np.abs(dist_sq - (a[2] + a[3])**2) <= 1e-3)
+
+        # step3: solve theta_4
+        sin_theta4 = -r33 / c5_safe
+        theta_4 = np.where(wrist_singular, 0, np.arcsin(np.clip(sin_theta4, -1, 1)) - theta_2 - theta_3)
+
+        # 低精度舍入误差经 arctan2 / arccos / arcsin 和除以 c5 放大后的关节角误差估计 (rad)，
+        # 用于判断 float32 的解或分支判定是否可能超出 FLOAT32_IK_TOL；float64 下不需要
+        low_precision = np.dtype(dtype) != np.float64
+        if low_precision:
+            eps = float(np.finfo(dtype).eps)
+            ab_sq = A**2 + B**2
+            err1 = eps * d[3] / np.sqrt(np.maximum(discriminant, eps * ab_sq))
+            err3 = eps * (dist_sq + a[2]**2 + a[3]**2) / (2 * a[2] * a[3]) / \
+                np.sqrt(np.maximum(1 - cos_theta3**2, eps))
+            err2 = eps * np.sqrt(px**2 + py**2 + pz**2) / np.sqrt(np.maximum(dist_sq, eps)) + err3
+            # c5 = cos(arcsin(sin_theta5)) 在 |c5| 小时相对误差约 eps / c5²，sin_theta4 / sin_theta6 都除以 c5；
+            # arcsin 在 ±1 附近放大误差，明显超出 [-1, 1] 的值截断后两种精度结果相同，按到 ±1 的距离计算
+            rel = (eps + err1) / np.maximum(c5**2, eps)
+            err46 = rel / np.sqrt(np.maximum(np.abs(1 - sin_theta4**2), eps)) + \
+                rel / np.sqrt(np.maximum(np.abs(1 - sin_theta6**2), eps))
+            err = REFINE_ERROR_FACTOR * (err1 + err2 + err46)
+            # 判别式在舍入误差内接近 0 时，float32 可能把有解判为无解；
+            # theta_1 / theta_5 / theta_6 的误差还会经 M、N 传到 cos_theta3 的有效性判定，按第一步的有效性检查
+            ambiguous = (np.abs(discriminant) < REFINE_ERROR_FACTOR * eps * (ab_sq + d[5]**2)) | \
+                np.any(step1_valid & (REFINE_ERROR_FACTOR * (err1 + err46) > FLOAT32_IK_TOL), axis=0) | \
+                np.any(valid & (err > FLOAT32_IK_TOL), axis=0)
+
+        th = np.empty((6, 12, n), dtype=dtype)
+        for k, theta in enumerate((theta_1, theta_2, theta_3, theta_4, theta_5, theta_6)):
+            th[k] = theta - float(self.offset[k])
+
+        # 归一化到 [-pi, pi]
+        th[th < -np.pi] += np.pi * 2
+        th[th > np.pi] -= np.pi * 2
+
+        # 约束检查
+        lim = self.joint_limits_rad
+        for k in range(6):
+            if low_precision:
+                # 距限位小于误差估计的解，float32 的判定可能与 float64 不同
+                margin = np.minimum(np.abs(th[k] - lim[k, 0]), np.abs(th[k] - lim[k, 1]))
+                ambiguous |= np.any(valid & (margin < err), axis=0)
+            valid &= (th[k] >= lim[k, 0]) & (th[k] <= lim[k, 1])    # nan 的比较结果为 False
+
+        # 检查重复：与之前已保留的分支比较，规则同 np.allclose(th, sol, rtol=1e-3, atol=1e-3)，
+        # 即各关节差值超出阈值的最大量 excess <= 0
+        thresh = 1e-3 + 1e-3 * np.abs(th)
+        for j in range(1, 12):
+            for i in range(j):
+                both = valid[i] & valid[j]
+                excess = np.max(np.abs(th[:, j] - th[:, i]) - thresh[:, i], axis=0)
+                if low_precision:
+                    # excess 在误差估计以内时去重结果不确定
+                    ambiguous |= both & (np.abs(excess) < err[i] + err[j])
+                valid[j] &= ~(both & (excess <= 0))
+
+        # 奇异阈值附近的位姿（低精度下分支判定可能出错），以及上面误差估计认为不可靠的位姿
+        tol = SINGULAR_REFINE_TOL
+        near_singular = np.any(np.abs(c5) < tol, axis=0) | \
+            np.any(general & (np.abs(np.abs(cos_theta3) - 1) < tol), axis=0) | \
+            np.any(~general & (np.abs(np.abs(dist_sq - (a[2] + a[3])**2) - 1e-3) < tol), axis=0)
+        if low_precision:
+            near_singular |= ambiguous
+
+        th = np.ascontiguousarray(th.transpose(2, 1, 0))
+        valid = np.ascontiguousarray(valid.T)
+        th[~valid] = np.nan
+        return th, valid, near_singular
+
+    def solve_optimal_sequence(self, poses, objective="total", q0=None, dtype=np.float64, chunk=4096,
+                               pose_format="euler"):
+        """
+        离线求解整条轨迹的全局最优分支序列（Viterbi 动态规划）
+        每个路点取全部有效分支，相邻路点的分支之间两两连边，选使整条路径代价最小的分支序列
+        :param poses: 目标位姿，格式由 pose_format 指定，默认 (N, 6) 数组，每行为 X, Y, Z, r, p, y
+        :param objective: "total" 最小化关节空间总运动量 sum ||dq||；
+                          "max_step" 最小化整条路径上单步最大关节变化 max |dq_i|（等时间间隔下即最大关节速度）
+        :param q0: 起始关节角，给定时第一个路点的代价按到 q0 的距离计算
+        :param dtype: 分支求解精度，见 solve_batch
+        :param chunk: 分块计算相邻路点代价矩阵的路点数，限制内存占用
+        :param pose_format: 位姿格式 "euler" / "quat" / "matrix"
+        :return: path (N, 6)，无解的路点为 nan；cost 最优代价
+        """
+        poses = np.asarray(poses, dtype=np.float64).reshape(POSE_SHAPES[pose_format])
+        sols, valid = self.solve_batch(poses, dtype=dtype, pose_format=pose_format)
+        path = np.full((len(poses), 6), np.nan)
+
+        # 无解的路点不参与动态规划
+        idx = np.nonzero(np.any(valid, axis=1))[0]
+        if len(idx) == 0:
+            return path, np.inf
+        sols = sols[idx].astype(np.float64)
+        valid = valid[idx]
+        n = len(idx)
+
+        def step_cost(a, b):
+            """a: (M, 12, 6)，b: (M, 12, 6) -> (M, 12, 12) 分支间代价，nan（无效分支）记为 inf"""
+            dq = np.abs(a[:, :, None, :] - b[:, None, :, :])
+            c = np.sqrt(np.sum(dq**2, axis=-1)) if objective == "total" else np.max(dq, axis=-1)
+            return np.where(np.isnan(c), np.inf, c)
+
+        if objective not in ("total", "max_step"):
+            raise ValueError("objective must be 'total' or 'max_step'")
+        combine = np.add if objective == "total" else np.maximum
+
+        # 第一个路点
+        if q0 is None:
+            cost = np.where(valid[0], 0.0, np.inf)
+        else:
+            cost = step_cost(np.asarray(q0, dtype=np.float64).reshape(1, 1, 6), sols[:1])[0, 0]
+        back = np.zeros((n, 12), dtype=np.int8)
+
+        # 前向递推：cost_t[j] = min_i combine(cost_{t-1}[i], C_t[i, j])
+        for start in range(1, n, chunk):
+            stop = min(start + chunk, n)
+            C = step_cost(sols[start - 1:stop - 1], sols[start:stop])
+            for t in range(start, stop):
+                total = combine(cost[:, None], C[t - start])
+                back[t] = np.argmin(total, axis=0)
+                cost = total[back[t], np.arange(12)]
+
+        # 回溯
+        j = int(np.argmin(cost))
+        best = cost[j]
+        for t in range(n - 1, -1, -1):
+            path[idx[t]] = sols[t, j]
+            j = back[t, j]
+
+        return path, best
+
+    def solve(self, print_all=False, continuous_with_positive_theta5=False, optimal_sequence=False,
+              objective="total"):
         """
         求解所有目标位姿
         :param print_all: 是否打印所有可行解
         :param continuous_with_positive_theta5: 第一个点选正theta_5，后续用连续性
+        :param optimal_sequence: 离线选取整条轨迹的全局最优分支序列
+        :param objective: optimal_sequence 的优化目标，见 solve_optimal_sequence
         """
         current_q = np.array([0.0, 0.0, 0.0, 0.0, 0.0, 0.0])
         is_first_point = True
+        if optimal_sequence:
+            path, _ = self.solve_optimal_sequence(self.end_lists, objective=objective,
+                                                  pose_format=self.pose_format)
         
         for i in range(len(self.end_lists)):
-            X, Y, Z, r, p, y = self.end_lists[i]
             print("IK solutions of end %d: " % (i+1))
             
-            valid_solutions = self.solve_one_pose(X, Y, Z, r, p, y)
+            valid_solutions = self.solve_one_pose(self.end_lists[i], pose_format=self.pose_format)
             
             if not valid_solutions:
                 print("  No valid solution found within joint limits.")
@@ -229,8 +465,124 @@ class IKSolver:
                     
                     print("  ", np.rad2deg(best_sol).round(2))
                     current_q = best_sol
+                elif optimal_sequence:
+                    # 模式5: 全局最优分支序列
+                    print("  Selected solution (globally optimal sequence):")
+                    print("  ", np.rad2deg(path[i]).round(2))
             print()
 
+def verify_batch_precision(solver, n=300000, seed=0):
+    """
+    验证批量求解：float64 与 solve_one_pose 逐点结果一致，float32 误差在 FLOAT32_IK_TOL 之内
+    :param solver: IKSolver 实例，一半测试位姿在其 end_lists 附近随机扰动生成，
+                   另一半由关节限位内均匀采样的关节角经正运动学得到（覆盖腕部奇异附近等误差放大的位姿）
+    :param n: 测试位姿数
+    :param seed: 随机种子
+    """
+    import importlib.util
+    import os
+    import time
+
+    from pose_convert import matrix_to_pose_batch
+
+    # 正运动学在 ForwardKinematics 目录中，按文件路径加载
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'ForwardKinematics', 'incremental_fk.py')
+    spec = importlib.util.spec_from_file_location('incremental_fk', path)
+    incremental_fk = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(incremental_fk)
+
+    rng = np.random.default_rng(seed)
+    base = np.asarray(solver.end_lists, dtype=np.float64)
+    m = n // 2
+    perturbed = base[rng.integers(0, len(base), m)] + rng.normal(0, [0.05] * 3 + [0.3] * 3, (m, 6))
+
+    dh = {'d1': solver.d[0], 'a2': solver.a[2], 'a3': solver.a[3],
+          'd4': solver.d[3], 'd5': solver.d[4], 'd6': solver.d[5], 'offset': solver.offset}
+    lim = solver.joint_limits_rad
+    q = rng.uniform(lim[:, 0], lim[:, 1], (n - m, 6))
+    sampled = matrix_to_pose_batch(incremental_fk.full_fk_batch(q, dh), "euler")
+    poses = np.concatenate([perturbed, sampled])
+
+    t0 = time.perf_counter()
+    sols64, valid64 = solver.solve_batch(poses)
+    t64 = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    sols32, valid32 = solver.solve_batch(poses, dtype=np.float32)
+    t32 = time.perf_counter() - t0
+
+    mismatch = 0
+    for i in range(1000):
+        ref = solver.solve_one_pose(*poses[i])
+        got = sols64[i][valid64[i]]
+        if len(ref) != len(got) or (ref and not np.allclose(ref, got, atol=1e-12)):
+            mismatch += 1
+
+    # 关节角差按 2pi 取模比较（+-pi 附近两种精度可能归一化到两端）
+    both = valid32 & valid64
+    diff = np.abs((sols32[both] - sols64[both] + np.pi) % (2 * np.pi) - np.pi)
+    err = np.max(diff) if np.any(both) else 0.0
+    ok = mismatch == 0 and np.array_equal(valid32, valid64) and err < FLOAT32_IK_TOL
+
+    print("  float64 batch vs solve_one_pose mismatches: %d / 1000" % mismatch)
+    print("  float32 branch mismatches: %d, max joint error: %.2e rad" % (np.sum(valid32 != valid64), err))
+    print("  %d poses | float64: %.1f ms | float32: %.1f ms | %s"
+          % (n, t64 * 1e3, t32 * 1e3, "PASS" if ok else "FAIL"))
+    return ok
+
+
+def verify_optimal_sequence(solver, n=100000):
+    """
+    验证全局最优分支序列：小规模与穷举结果一致，并与逐点贪心选择比较总运动量
+    :param solver: IKSolver 实例，轨迹由其 end_lists 依次线性插值生成
+    :param n: 轨迹路点数
+    """
+    import itertools
+    import time
+
+    base = np.asarray(solver.end_lists, dtype=np.float64)
+    s = np.linspace(0, len(base) - 1, n)
+    k = np.minimum(s.astype(int), len(base) - 2)
+    poses = base[k] + (s - k)[:, None] * (base[k + 1] - base[k])
+
+    # 1. 穷举验证（前 5 个有解路点，每隔 n/10 取一个以产生分支切换）
+    sols, valid = solver.solve_batch(poses)
+    pick = [i for i in range(0, n, n // 10) if np.any(valid[i])][:5]
+    branch_sets = [sols[i][valid[i]] for i in pick]
+    brute = min(sum(np.linalg.norm(seq[t + 1] - seq[t]) for t in range(len(seq) - 1))
+                for seq in itertools.product(*branch_sets))
+    _, dp = solver.solve_optimal_sequence(poses[pick])
+
+    # 2. 全轨迹：动态规划 vs 贪心（与 solve 的连续性模式相同的选择规则）
+    t0 = time.perf_counter()
+    path, _ = solver.solve_optimal_sequence(poses)
+    elapsed = time.perf_counter() - t0
+
+    greedy = np.full((n, 6), np.nan)
+    current_q = None
+    for i in range(n):
+        cand = sols[i][valid[i]]
+        if len(cand) == 0:
+            continue
+        if current_q is None:
+            positive = cand[cand[:, 4] > 0]
+            current_q = max(positive if len(positive) else cand, key=lambda x: x[4])
+        else:
+            current_q = cand[np.argmin(np.sum((cand - current_q)**2, axis=1))]
+        greedy[i] = current_q
+
+    def motion(q):
+        q = q[~np.isnan(q[:, 0])]
+        dq = np.abs(np.diff(q, axis=0))
+        return np.sum(np.linalg.norm(dq, axis=1)), np.max(dq)
+
+    ok = abs(brute - dp) < 1e-9
+    print("  brute force: %.6f | DP: %.6f | %s" % (brute, dp, "PASS" if ok else "FAIL"))
+    print("  %d waypoints x 12 branches: %.2f s" % (n, elapsed))
+    print("  total motion (rad) | greedy: %.3f | optimal: %.3f" % (motion(greedy)[0], motion(path)[0]))
+    print("  max joint step (rad) | greedy: %.3f | optimal: %.3f" % (motion(greedy)[1], motion(path)[1]))
+    return ok
+
+
 if __name__ == "__main__":
     np.set_printoptions(suppress=True, precision=2)
     
@@ -252,4 +604,15 @@ if __name__ == "__main__":
     print("\n" + "=" * 60)
     print("模式2: theta_5取正，并使用连续性约束")
     print("=" * 60)
-    solver.solve(continuous_with_positive_theta5=True)
\ No newline at end of file
+    solver.solve(continuous_with_positive_theta5=True)
+
+    print("\n" + "=" * 60)
+    print("模式3: 批量求解精度验证 (float32 vs float64)")
+    print("=" * 60)
+    verify_batch_precision(solver)
+
+    print("\n" + "=" * 60)
+    print("模式4: 全局最优分支序列")
+    print("=" * 60)
+    solver.solve(optimal_sequence=True)
+    verify_optimal_sequence(solver)
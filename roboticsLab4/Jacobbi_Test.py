@@ -3,9 +3,8 @@ try:
     import roboticstoolbox as rtb
     from spatialmath import SE3
 except ImportError:
-    print("请先安装依赖: pip install roboticstoolbox-python")
-    print("如果安装失败,请尝试: pip install roboticstoolbox-python spatialmath-python")
-    exit(1)
+    # 批量运动学核函数只依赖 numpy，roboticstoolbox 仅在验证时需要
+    rtb = None
 
 
 def analytical_jacobian(q):
@@ -157,6 +156,231 @@ def analytical_jacobian(q):
     return J
 
 
+# ZJU-I 型机械臂 DH 参数（单位：mm）
+# 标定后的模型 (见 calibration.py) 还可带 'offset' 键: 6 个关节零位偏置 (弧度), 实际关节角 q 对应模型角 q + offset
+DH_PARAMS = {'d1': 230, 'a2': 185, 'a3': 170, 'd4': 23, 'd5': 77, 'd6': 85.5}
+
+# float32 批量核函数相对 float64 的误差上界（关节角在 [-pi, pi] 内均匀采样实测后留余量）
+#   末端位置: < 5e-4 mm      旋转矩阵元素 (即姿态角): < 2e-6 rad
+#   雅可比线速度部分: < 5e-4 mm/rad      角速度部分: < 2e-6
+FLOAT32_FK_POS_TOL = 5e-4
+FLOAT32_ROT_TOL = 2e-6
+
+
+def _trig_terms(q, dtype=np.float64, offset=None):
+    """
+    批量计算正运动学和雅可比共用的三角项
+
+    参数:
+        q: 关节角度 (N, 6) 或 (6,) (弧度)
+        dtype: 计算与存储精度 (np.float64 或 np.float32)
+        offset: 关节零位偏置 (6,) (弧度), 默认无偏置
+
+    返回:
+        t: 三角项字典, 每项形状为 (N,)
+    """
+    q = np.asarray(q, dtype=dtype).reshape(-1, 6)
+    if offset is not None:
+        q = q + np.asarray(offset, dtype=dtype)
+    q23 = q[:, 1] + q[:, 2]
+    q234 = q23 + q[:, 3]
+    return {
+        's1': np.sin(q[:, 0]), 'c1': np.cos(q[:, 0]),
+        's2': np.sin(q[:, 1]), 'c2': np.cos(q[:, 1]),
+        's23': np.sin(q23), 'c23': np.cos(q23),
+        's234': np.sin(q234), 'c234': np.cos(q234),
+        's5': np.sin(q[:, 4]), 'c5': np.cos(q[:, 4]),
+        's6': np.sin(q[:, 5]), 'c6': np.cos(q[:, 5]),
+    }
+
+
+def forward_kinematics_batch(q, dh=None, dtype=np.float64, pose_format="matrix"):
+    """
+    批量计算ZJU-I机械臂的正运动学 (闭式解, 与 T_01 * T_12 * ... * T_56 一致)
+
+    参数:
+        q: 关节角度 (N, 6) 或 (6,) (弧度)
+        dh: DH 参数字典 (mm), 默认 DH_PARAMS
+        dtype: 计算与存储精度, np.float32 时内存和带宽减半,
+               误差上界见 FLOAT32_FK_POS_TOL / FLOAT32_ROT_TOL
+        pose_format: 输出格式 "matrix" / "euler" / "quat", 见 pose_convert.POSE_SHAPES
+
+    返回:
+        T: (N, 4, 4) 齐次变换矩阵, 或 (N, 6) X'Y'Z' 欧拉角位姿, 或 (N, 7) 四元数位姿 (位置单位 mm)
+    """
+    if dh is None:
+        dh = DH_PARAMS
+    d1, a2, a3, d4, d5, d6 = (dh[k] for k in ('d1', 'a2', 'a3', 'd4', 'd5', 'd6'))
+
+    t = _trig_terms(q, dtype, dh.get('offset'))
+    s1, c1, s5, c5, s6, c6 = t['s1'], t['c1'], t['s5'], t['c5'], t['s6'], t['c6']
+    s234, c234 = t['s234'], t['c234']
+
+    T = np.zeros((len(s1), 4, 4), dtype=dtype)
+
+    # 公共项: 腕部姿态在 1 号关节竖直平面内的分量
+    u = c234 * s5 * c6 - s234 * s6
+    v = c234 * s5 * s6 + s234 * c6
+    w = c234 * c5
+
+    # 旋转部分
+    T[:, 0, 0] = -c1 * u - s1 * c5 * c6
+    T[:, 0, 1] = c1 * v + s1 * c5 * s6
+    T[:, 0, 2] = c1 * w - s1 * s5
+    T[:, 1, 0] = -s1 * u + c1 * c5 * c6
+    T[:, 1, 1] = s1 * v - c1 * c5 * s6
+    T[:, 1, 2] = s1 * w + c1 * s5
+    T[:, 2, 0] = c234 * s6 + s234 * s5 * c6
+    T[:, 2, 1] = c234 * c6 - s234 * s5 * s6
+    T[:, 2, 2] = -s234 * c5
+
+    # 位置部分
+    r = a2 * t['s2'] + a3 * t['s23'] + d5 * s234 + d6 * w
+    T[:, 0, 3] = c1 * r - s1 * (d4 + d6 * s5)
+    T[:, 1, 3] = s1 * r + c1 * (d4 + d6 * s5)
+    T[:, 2, 3] = a2 * t['c2'] + a3 * t['c23'] + d5 * c234 + d1 - d6 * s234 * c5
+    T[:, 3, 3] = 1
+
+    if pose_format != "matrix":
+        # 位姿表示转换 (欧拉角 / 四元数) 与逆运动学共用, 只在需要时加载
+        from lab3_modules import load_lab3_module
+        return load_lab3_module('pose_convert').matrix_to_pose_batch(T, pose_format)
+    return T
+
+
+def analytical_jacobian_batch(q, dh=None, dtype=np.float64):
+    """
+    批量计算解析雅可比矩阵, 逐元素公式与 analytical_jacobian 相同
+
+    参数:
+        q: 关节角度 (N, 6) 或 (6,) (弧度)
+        dh: DH 参数字典 (mm), 默认 DH_PARAMS
+        dtype: 计算与存储精度 (np.float64 或 np.float32)
+
+    返回:
+        J: (N, 6, 6) 雅可比矩阵
+    """
+    if dh is None:
+        dh = DH_PARAMS
+    a2, a3, d4, d5, d6 = (dh[k] for k in ('a2', 'a3', 'd4', 'd5', 'd6'))
+
+    t = _trig_terms(q, dtype, dh.get('offset'))
+    s1, c1, s5, c5 = t['s1'], t['c1'], t['s5'], t['c5']
+    s234, c234 = t['s234'], t['c234']
+
+    J = np.zeros((len(s1), 6, 6), dtype=dtype)
+
+    # 末端到 1 号关节轴的水平距离 r 与切向偏置 h
+    r = a2 * t['s2'] + a3 * t['s23'] + d5 * s234 + d6 * c5 * c234
+    h = d4 + d6 * s5
+
+    # 第1列
+    J[:, 0, 0] = -s1 * r - c1 * h
+    J[:, 1, 0] = c1 * r - s1 * h
+    J[:, 5, 0] = 1
+
+    # 第2~4列: 平面内三个平行轴, 共用 Jv4 -> Jv3 -> Jv2 累加
+    Jv4_common = -d6 * s234 * c5 + d5 * c234
+    Jv4_z = -d5 * s234 - d6 * c5 * c234
+    Jv3_common = Jv4_common + a3 * t['c23']
+    Jv3_z = Jv4_z - a3 * t['s23']
+    Jv2_common = Jv3_common + a2 * t['c2']
+    Jv2_z = Jv3_z - a2 * t['s2']
+
+    for col, common, vz in ((1, Jv2_common, Jv2_z),
+                            (2, Jv3_common, Jv3_z),
+                            (3, Jv4_common, Jv4_z)):
+        J[:, 0, col] = c1 * common
+        J[:, 1, col] = s1 * common
+        J[:, 2, col] = vz
+        J[:, 3, col] = -s1
+        J[:, 4, col] = c1
+
+    # 第5列
+    J[:, 0, 4] = -d6 * (s1 * c5 + s5 * c1 * c234)
+    J[:, 1, 4] = d6 * (c1 * c5 - s1 * s5 * c234)
+    J[:, 2, 4] = d6 * s5 * s234
+    J[:, 3, 4] = s234 * c1
+    J[:, 4, 4] = s1 * s234
+    J[:, 5, 4] = c234
+
+    # 第6列 (只有角速度)
+    J[:, 3, 5] = -s1 * s5 + c1 * c5 * c234
+    J[:, 4, 5] = s1 * c5 * c234 + s5 * c1
+    J[:, 5, 5] = -s234 * c5
+
+    return J
+
+
+def jacobian_hessian_batch(q, dh=None, dtype=np.float64, J=None):
+    """
+    批量计算运动学 Hessian: H[:, :, i, k] = dJ[:, i] / dq_k
+
+    对转动关节, 雅可比第 i 列为 [z_i x (p - o_i); z_i], 对 q_k 求导得
+        线速度部分: k <= i 时为 z_k x Jv_i,  k > i 时为 z_i x Jv_k
+        角速度部分: k <  i 时为 z_k x z_i,   否则为 0
+    只需雅可比本身的列向量, 与 analytical_jacobian_batch 共用全部三角项
+
+    参数:
+        q: 关节角度 (N, 6) 或 (6,) (弧度)
+        dh: DH 参数字典 (mm), 默认 DH_PARAMS
+        dtype: 计算与存储精度 (np.float64 或 np.float32)
+        J: 已计算好的 analytical_jacobian_batch(q) 结果, 传入时不再重复计算
+
+    返回:
+        H: (N, 6, 6, 6) 运动学 Hessian
+    """
+    if J is None:
+        J = analytical_jacobian_batch(q, dh, dtype)
+    Jv = J[:, :3, :].transpose(0, 2, 1)    # (N, 6, 3), 第 i 行为 Jv_i
+    z = J[:, 3:, :].transpose(0, 2, 1)     # (N, 6, 3), 第 i 行为 z_i
+
+    # C[:, a, b] = z_a x Jv_b,  W[:, a, b] = z_a x z_b
+    C = np.cross(z[:, :, None, :], Jv[:, None, :, :])
+    W = np.cross(z[:, :, None, :], z[:, None, :, :])
+
+    i, k = np.meshgrid(np.arange(6), np.arange(6), indexing='ij')
+    H = np.empty((len(J), 6, 6, 6), dtype=J.dtype)
+    H[:, :3] = C[:, np.minimum(i, k), np.maximum(i, k)].transpose(0, 3, 1, 2)
+    H[:, 3:] = (W[:, k, i] * (k < i)[..., None]).transpose(0, 3, 1, 2)
+    return H
+
+
+def jacobian_dot_batch(q, qd, dh=None, dtype=np.float64, J=None):
+    """
+    批量计算雅可比的时间导数 dJ/dt = sum_k H[:, :, :, k] * qd_k (闭式, 不做差分)
+
+    令 w_i = sum_{k<=i} qd_k z_k (连杆 i 的角速度), S_i = sum_{k>i} qd_k Jv_k, 则
+        dJv_i/dt = w_i x Jv_i + z_i x S_i
+        dJw_i/dt = w_{i-1} x z_i
+
+    参数:
+        q: 关节角度 (N, 6) 或 (6,) (弧度)
+        qd: 关节角速度 (N, 6) 或 (6,) (弧度/秒)
+        dh: DH 参数字典 (mm), 默认 DH_PARAMS
+        dtype: 计算与存储精度 (np.float64 或 np.float32)
+        J: 已计算好的 analytical_jacobian_batch(q) 结果, 控制周期内可与 J 共用
+
+    返回:
+        Jd: (N, 6, 6) 雅可比时间导数
+    """
+    if J is None:
+        J = analytical_jacobian_batch(q, dh, dtype)
+    qd = np.asarray(qd, dtype=J.dtype).reshape(-1, 6)[:, :, None]
+    Jv = J[:, :3, :].transpose(0, 2, 1)
+    z = J[:, 3:, :].transpose(0, 2, 1)
+
+    wz = z * qd
+    w = np.cumsum(wz, axis=1)
+    v = Jv * qd
+    S = np.sum(v, axis=1, keepdims=True) - np.cumsum(v, axis=1)
+
+    Jd = np.empty_like(J)
+    Jd[:, :3, :] = (np.cross(w, Jv) + np.cross(z, S)).transpose(0, 2, 1)
+    Jd[:, 3:, :] = np.cross(w - wz, z).transpose(0, 2, 1)
+    return Jd
+
+
 def create_robot_modified_dh():
     """
     使用Modified DH参数创建ZJU-I机械臂模型
@@ -226,7 +450,109 @@ def verify_jacobian(q_test):
     return max_diff < 1e-10
 
 
+def verify_batch_precision(n=200000, seed=0):
+    """
+    验证批量核函数: float64 与逐点 analytical_jacobian 一致,
+    float32 相对 float64 的误差在 FLOAT32_FK_POS_TOL / FLOAT32_ROT_TOL 之内
+
+    参数:
+        n: 随机关节角样本数
+        seed: 随机种子
+    """
+    import time
+
+    q = np.random.default_rng(seed).uniform(-np.pi, np.pi, (n, 6))
+
+    T64 = forward_kinematics_batch(q)
+    J64 = analytical_jacobian_batch(q)
+    scalar_diff = max(np.max(np.abs(J64[i] - analytical_jacobian(q[i]))) for i in range(100))
+
+    T32 = forward_kinematics_batch(q, dtype=np.float32)
+    J32 = analytical_jacobian_batch(q, dtype=np.float32)
+    pos_err = np.max(np.abs(T32[:, :3, 3] - T64[:, :3, 3]))
+    rot_err = np.max(np.abs(T32[:, :3, :3] - T64[:, :3, :3]))
+    jv_err = np.max(np.abs(J32[:, :3] - J64[:, :3]))
+    jw_err = np.max(np.abs(J32[:, 3:] - J64[:, 3:]))
+
+    ok = (scalar_diff < 1e-10 and pos_err < FLOAT32_FK_POS_TOL and jv_err < FLOAT32_FK_POS_TOL
+          and rot_err < FLOAT32_ROT_TOL and jw_err < FLOAT32_ROT_TOL)
+
+    # 计时: 同一批样本分别用 float64 / float32 计算 FK + 雅可比
+    timings = {}
+    for dtype in (np.float64, np.float32):
+        q_dt = q.astype(dtype)
+        t0 = time.perf_counter()
+        forward_kinematics_batch(q_dt, dtype=dtype)
+        analytical_jacobian_batch(q_dt, dtype=dtype)
+        timings[dtype] = time.perf_counter() - t0
+
+    print(f"批量 vs 逐点雅可比差异: {scalar_diff:.2e}")
+    print(f"float32 误差 | 位置: {pos_err:.2e} mm | 姿态: {rot_err:.2e} rad | "
+          f"Jv: {jv_err:.2e} mm/rad | Jw: {jw_err:.2e} | {'✓ 通过' if ok else '✗ 失败'}")
+    print(f"{n} 组 FK+雅可比耗时 | float64: {timings[np.float64] * 1e3:.1f} ms | "
+          f"float32: {timings[np.float32] * 1e3:.1f} ms")
+
+    return ok
+
+
+def verify_jacobian_derivatives(n=10000, seed=0, eps=1e-6):
+    """
+    用中心差分验证运动学 Hessian 和雅可比时间导数
+
+    参数:
+        n: 随机样本数
+        seed: 随机种子
+        eps: 差分步长 (弧度)
+    """
+    import time
+
+    rng = np.random.default_rng(seed)
+    q = rng.uniform(-np.pi, np.pi, (n, 6))
+    qd = rng.uniform(-1, 1, (n, 6))
+
+    J = analytical_jacobian_batch(q)
+    H = jacobian_hessian_batch(q, J=J)
+    Jd = jacobian_dot_batch(q, qd, J=J)
+
+    H_fd = np.empty_like(H)
+    for k in range(6):
+        dq = np.zeros(6)
+        dq[k] = eps
+        H_fd[..., k] = (analytical_jacobian_batch(q + dq) - analytical_jacobian_batch(q - dq)) / (2 * eps)
+    Jd_fd = (analytical_jacobian_batch(q + eps * qd) - analytical_jacobian_batch(q - eps * qd)) / (2 * eps)
+
+    h_err = np.max(np.abs(H - H_fd))
+    jd_err = np.max(np.abs(Jd - Jd_fd))
+    hq_err = np.max(np.abs(np.einsum('nrik,nk->nri', H, qd) - Jd))
+    ok = h_err < 1e-4 and jd_err < 1e-4 and hq_err < 1e-9
+
+    t0 = time.perf_counter()
+    J = analytical_jacobian_batch(q)
+    jacobian_dot_batch(q, qd, J=J)
+    elapsed = time.perf_counter() - t0
+
+    print(f"Hessian 差分误差: {h_err:.2e} | dJ/dt 差分误差: {jd_err:.2e} | "
+          f"H*qd - dJ/dt: {hq_err:.2e} | {'✓ 通过' if ok else '✗ 失败'}")
+    print(f"{n} 组 J + dJ/dt 耗时: {elapsed * 1e3:.1f} ms")
+    return ok
+
+
 if __name__ == "__main__":
+    print("\n" + "=" * 80)
+    print("批量核函数精度验证 (float32 vs float64)")
+    print("=" * 80)
+    verify_batch_precision()
+
+    print("\n" + "=" * 80)
+    print("雅可比时间导数与运动学 Hessian 验证 (中心差分)")
+    print("=" * 80)
+    verify_jacobian_derivatives()
+
+    if rtb is None:
+        print("请先安装依赖: pip install roboticstoolbox-python")
+        print("如果安装失败,请尝试: pip install roboticstoolbox-python spatialmath-python")
+        exit(1)
+
     print("\n" + "=" * 80)
     print("ZJU-I型机械臂雅可比矩阵验证 (Modified DH)")
     print("=" * 80)
@@ -0,0 +1,241 @@
+import json
+import time
+
+import numpy as np
+
+from Jacobbi_Test import DH_PARAMS, forward_kinematics_batch, analytical_jacobian_batch
+
+# 标定参数顺序: 6 个连杆长度 (mm) + 6 个关节零位偏置 (弧度)
+LENGTH_KEYS = ('d1', 'a2', 'a3', 'd4', 'd5', 'd6')
+N_PARAMS = len(LENGTH_KEYS) + 6
+
+
+def pack_params(dh):
+    """DH 参数字典 -> 参数向量 (12,)"""
+    offset = dh.get('offset', np.zeros(6))
+    return np.concatenate([[dh[k] for k in LENGTH_KEYS], offset]).astype(np.float64)
+
+
+def unpack_params(x):
+    """参数向量 (12,) -> DH 参数字典, 可直接传给 forward_kinematics_batch / analytical_jacobian_batch / IKSolver"""
+    dh = {k: float(v) for k, v in zip(LENGTH_KEYS, x[:6])}
+    dh['offset'] = np.array(x[6:], dtype=np.float64)
+    return dh
+
+
+def pose_error_batch(T_meas, T_model):
+    """
+    批量计算位姿误差 (测量 - 模型)
+
+    参数:
+        T_meas: (N, 4, 4) 测量位姿 (mm)
+        T_model: (N, 4, 4) 模型位姿 (mm)
+
+    返回:
+        e: (N, 6) 前 3 项为位置误差 (mm), 后 3 项为基坐标系下的小角度旋转误差 (弧度),
+           满足 R_meas ≈ exp([e_w]x) R_model
+    """
+    e = np.empty((len(T_meas), 6))
+    e[:, :3] = T_meas[:, :3, 3] - T_model[:, :3, 3]
+    dR = T_meas[:, :3, :3] @ T_model[:, :3, :3].transpose(0, 2, 1)
+    e[:, 3] = 0.5 * (dR[:, 2, 1] - dR[:, 1, 2])
+    e[:, 4] = 0.5 * (dR[:, 0, 2] - dR[:, 2, 0])
+    e[:, 5] = 0.5 * (dR[:, 1, 0] - dR[:, 0, 1])
+    return e
+
+
+def identification_jacobian_batch(q, dh):
+    """
+    批量计算位姿对全部标定参数的辨识雅可比
+
+    位置对连杆长度是线性的, 偏导数就是对应的连杆方向向量;
+    关节零位偏置与关节角等价, 偏导数就是几何雅可比的对应列
+
+    参数:
+        q: 关节角度 (N, 6) (弧度)
+        dh: 当前 DH 参数字典
+
+    返回:
+        G: (N, 6, 12) 辨识雅可比
+    """
+    q = np.asarray(q, dtype=np.float64).reshape(-1, 6)
+    qm = q + dh.get('offset', 0)
+
+    s1, c1 = np.sin(qm[:, 0]), np.cos(qm[:, 0])
+    s2, c2 = np.sin(qm[:, 1]), np.cos(qm[:, 1])
+    s23, c23 = np.sin(qm[:, 1] + qm[:, 2]), np.cos(qm[:, 1] + qm[:, 2])
+    q234 = qm[:, 1] + qm[:, 2] + qm[:, 3]
+    s234, c234 = np.sin(q234), np.cos(q234)
+    s5, c5 = np.sin(qm[:, 4]), np.cos(qm[:, 4])
+
+    G = np.zeros((len(q), 6, N_PARAMS))
+
+    # 连杆长度: 只影响位置
+    G[:, 2, 0] = 1                                                  # d1
+    G[:, 0, 1], G[:, 1, 1], G[:, 2, 1] = c1 * s2, s1 * s2, c2       # a2
+    G[:, 0, 2], G[:, 1, 2], G[:, 2, 2] = c1 * s23, s1 * s23, c23    # a3
+    G[:, 0, 3], G[:, 1, 3] = -s1, c1                                # d4
+    G[:, 0, 4], G[:, 1, 4], G[:, 2, 4] = c1 * s234, s1 * s234, c234  # d5
+    G[:, 0, 5] = c1 * c5 * c234 - s1 * s5                           # d6 (末端 z 轴)
+    G[:, 1, 5] = s1 * c5 * c234 + c1 * s5
+    G[:, 2, 5] = -s234 * c5
+
+    # 关节零位偏置
+    G[:, :, 6:] = analytical_jacobian_batch(q, dh)
+
+    return G
+
+
+def calibrate(q, T_meas, dh0=None, rot_weight=100.0, max_iter=20, tol=1e-9, damping=1e-3, verbose=True):
+    """
+    由 (关节角, 测量位姿) 数据对辨识 DH 参数和关节零位偏置 (Levenberg-Marquardt)
+
+    每次迭代对全部数据批量计算残差和辨识雅可比, 只累加 12x12 的正规方程;
+    求解 (H + lambda * diag(H)) dx = g, 代价下降时接受该步并把 lambda 缩小 10 倍,
+    否则拒绝该步、lambda 放大 10 倍后用同一个 H 重新求解
+
+    参数:
+        q: 关节角度 (N, 6) (弧度)
+        T_meas: 测量位姿 (N, 4, 4) (mm)
+        dh0: 初始 DH 参数字典, 默认名义值 DH_PARAMS
+        rot_weight: 旋转误差权重 (mm/rad), 把姿态误差换算到与位置误差相当的量级
+        max_iter: 最大迭代次数 (接受的步数)
+        tol: 参数更新量 (按 mm / rad 计) 的收敛阈值
+        damping: LM 阻尼系数 lambda 的初值 (相对于正规方程对角线)
+        verbose: 是否打印每次迭代的残差
+
+    返回:
+        dh: 标定后的 DH 参数字典 (含 'offset')
+        info: 迭代信息字典 (iterations, rms_pos, rms_rot, history, damping)
+    """
+    q = np.asarray(q, dtype=np.float64).reshape(-1, 6)
+    T_meas = np.asarray(T_meas, dtype=np.float64).reshape(-1, 4, 4)
+    x = pack_params(DH_PARAMS if dh0 is None else dh0)
+    w = np.array([1, 1, 1, rot_weight, rot_weight, rot_weight])
+
+    def weighted_cost(e):
+        return np.mean(np.sum((e * w) ** 2, axis=1))
+
+    dh = unpack_params(x)
+    e = pose_error_batch(T_meas, forward_kinematics_batch(q, dh))
+    cost = weighted_cost(e)
+    lam = damping
+    history = []
+    iterations = 0
+    for it in range(max_iter):
+        history.append(cost)
+        if verbose:
+            print(f"  迭代 {it:2d} | 位置 RMS: {np.sqrt(np.mean(e[:, :3] ** 2)):.4f} mm | "
+                  f"姿态 RMS: {np.sqrt(np.mean(e[:, 3:] ** 2)):.2e} rad | lambda: {lam:.1e}")
+
+        # 加权正规方程 H dx = g
+        G = identification_jacobian_batch(q, dh)
+        Gw = G * w[None, :, None]
+        H = np.einsum('nij,nik->jk', Gw, Gw)
+        g = np.einsum('nij,ni->j', Gw, e * w)
+        diag = np.diag(H).copy()
+
+        # 增大阻尼直到代价下降; 阻尼已很大仍不下降说明已在极小值处
+        while lam < 1e10:
+            H[np.diag_indices_from(H)] = diag * (1 + lam)
+            dx = np.linalg.solve(H, g)
+            dh_new = unpack_params(x + dx)
+            e_new = pose_error_batch(T_meas, forward_kinematics_batch(q, dh_new))
+            cost_new = weighted_cost(e_new)
+            if cost_new < cost:
+                break
+            lam *= 10
+        else:
+            break
+
+        x, dh, e, cost = x + dx, dh_new, e_new, cost_new
+        lam = max(lam / 10, 1e-12)
+        iterations = it + 1
+        if np.max(np.abs(dx)) < tol:
+            break
+
+    info = {
+        'iterations': iterations,
+        'rms_pos': float(np.sqrt(np.mean(e[:, :3] ** 2))),
+        'rms_rot': float(np.sqrt(np.mean(e[:, 3:] ** 2))),
+        'history': history,
+        'damping': lam,
+    }
+    return dh, info
+
+
+def save_model(path, dh):
+    """把标定后的模型导出为 JSON, 长度单位 mm, 偏置单位弧度"""
+    model = {k: float(dh[k]) for k in LENGTH_KEYS}
+    model['offset'] = [float(v) for v in dh.get('offset', np.zeros(6))]
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(model, f, indent=2)
+
+
+def load_model(path):
+    """读取 save_model 导出的模型, 返回可直接传给各运动学核函数的 DH 参数字典"""
+    with open(path, 'r', encoding='utf-8') as f:
+        model = json.load(f)
+    model['offset'] = np.array(model.get('offset', np.zeros(6)), dtype=np.float64)
+    return model
+
+
+def _random_small_rotation(rng, n, sigma):
+    """生成 n 个小角度随机旋转矩阵 (Rodrigues 公式), 转角标准差约为 sigma"""
+    w = rng.normal(0, sigma, (n, 3))
+    theta = np.linalg.norm(w, axis=1)[:, None, None]
+    K = np.zeros((n, 3, 3))
+    K[:, 0, 1], K[:, 0, 2], K[:, 1, 2] = -w[:, 2], w[:, 1], -w[:, 0]
+    K = K - K.transpose(0, 2, 1)
+    theta = np.maximum(theta, 1e-300)
+    return np.eye(3) + np.sin(theta) / theta * K + (1 - np.cos(theta)) / theta**2 * (K @ K)
+
+
+def verify_calibration(n=100000, seed=0):
+    """
+    用仿真数据验证标定: 在名义参数上加毫米级误差和零位偏置作为 "真实" 机械臂,
+    生成带噪声的测量位姿, 再从名义参数出发辨识
+
+    参数:
+        n: 测量数据组数
+        seed: 随机种子
+    """
+    rng = np.random.default_rng(seed)
+
+    x_nominal = pack_params(DH_PARAMS)
+    x_true = x_nominal + np.concatenate([rng.uniform(-3, 3, 6), np.deg2rad(rng.uniform(-0.5, 0.5, 6))])
+    dh_true = unpack_params(x_true)
+
+    q = rng.uniform(-np.pi, np.pi, (n, 6))
+    T_meas = forward_kinematics_batch(q, dh_true)
+    T_meas[:, :3, 3] += rng.normal(0, 0.05, (n, 3))                           # 0.05 mm 位置噪声
+    T_meas[:, :3, :3] = _random_small_rotation(rng, n, 1e-4) @ T_meas[:, :3, :3]  # 1e-4 rad 姿态噪声
+
+    t0 = time.perf_counter()
+    dh_fit, info = calibrate(q, T_meas)
+    elapsed = time.perf_counter() - t0
+
+    x_fit = pack_params(dh_fit)
+    len_err = np.max(np.abs(x_fit[:6] - x_true[:6]))
+    off_err = np.max(np.abs(x_fit[6:] - x_true[6:]))
+    # LM 只接受使代价下降的步; max_iter=0 时直接返回初值的残差
+    monotone = bool(np.all(np.diff(info['history']) < 0))
+    _, info0 = calibrate(q[:100], T_meas[:100], max_iter=0, verbose=False)
+    ok = len_err < 0.01 and off_err < 1e-4 and monotone and info0['iterations'] == 0
+
+    print(f"\n{'参数':>10} | {'名义值':>10} | {'真实值':>10} | {'标定值':>10}")
+    names = list(LENGTH_KEYS) + [f"offset{i + 1}" for i in range(6)]
+    for i, name in enumerate(names):
+        scale = 1 if i < 6 else 180 / np.pi
+        print(f"{name:>10} | {x_nominal[i] * scale:10.4f} | {x_true[i] * scale:10.4f} | {x_fit[i] * scale:10.4f}")
+    print(f"\n{n} 组数据, {info['iterations']} 次迭代, 耗时 {elapsed:.2f} s | 代价单调下降: {monotone}")
+    print(f"最大长度误差: {len_err:.2e} mm | 最大偏置误差: {off_err:.2e} rad | {'✓ 通过' if ok else '✗ 失败'}")
+
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("ZJU-I型机械臂运动学标定 (仿真数据)")
+    print("=" * 80)
+    verify_calibration()
@@ -0,0 +1,312 @@
+import json
+import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import numpy as np
+
+from Jacobbi_Test import DH_PARAMS, forward_kinematics_batch, analytical_jacobian_batch
+from lab3_modules import load_lab3_module
+from workspace import JOINT_LIMITS_DEG
+
+# 各位姿格式的数组形状, 与逆运动学的位姿表示转换共用
+POSE_SHAPES = load_lab3_module('pose_convert').POSE_SHAPES
+
+MANIFEST_NAME = 'manifest.json'
+MANIFEST_VERSION = 1
+
+
+def branch_ids_batch(q, dh=None):
+    """
+    批量计算关节角对应的逆解分支编号 (0 ~ 3)
+
+    编号 = 2 * (sgn1 > 0) + (sgn3 > 0), 两个符号与 runCalcConstrain._BRANCH_SIGNS 中的含义相同:
+        sgn1 肩部: 腕心在 1 号关节竖直平面内的水平距离 r = a2*s2 + a3*s23 + d5*s234 的反号
+        sgn3 肘部: theta_3 的符号
+    等于 0 的边界情况记为正号
+
+    逆解的腕部符号 sgn2 不编入: 正确的解上 sgn2 恒为 +1, 它不区分同一位姿的不同构型
+
+    参数:
+        q: 关节角度 (N, 6) (弧度)
+        dh: DH 参数字典 (mm), 默认 DH_PARAMS
+
+    返回:
+        branch: (N,) int8
+    """
+    if dh is None:
+        dh = DH_PARAMS
+    qm = np.asarray(q, dtype=np.float64).reshape(-1, 6) + dh.get('offset', 0)
+    q23 = qm[:, 1] + qm[:, 2]
+    r = dh['a2'] * np.sin(qm[:, 1]) + dh['a3'] * np.sin(q23) + dh['d5'] * np.sin(q23 + qm[:, 3])
+    shoulder = r <= 0
+    elbow = qm[:, 2] >= 0
+    return (2 * shoulder + elbow).astype(np.int8)
+
+
+def dataset_fields(pose_format="euler", dtype=np.float32):
+    """
+    每个分片包含的字段: 名称 -> (单个样本的形状, 存储类型)
+
+    参数:
+        pose_format: 位姿格式 "euler" / "quat" / "matrix" (位置单位 mm)
+        dtype: 浮点字段的存储精度
+    """
+    dtype = np.dtype(dtype).name
+    return {
+        'q': ((6,), dtype),
+        'pose': (POSE_SHAPES[pose_format][1:], dtype),
+        'jacobian': ((6, 6), dtype),
+        'branch': ((), 'int8'),
+    }
+
+
+def _shard_name(index):
+    return f"shard_{index:06d}"
+
+
+def generate_shard(out_dir, index, config):
+    """
+    生成一个分片: 先写入临时目录, 全部字段写完后整体改名, 中断时不会留下不完整的分片
+
+    每个字段是一个 .npy 内存映射文件, 按 config['chunk'] 个样本分块计算并写入,
+    进程内只持有一个数据块
+
+    参数:
+        out_dir: 数据集目录
+        index: 分片编号 (随机数流由 (seed, index) 决定, 与生成顺序和进程数无关)
+        config: 数据集配置 (见 generate_dataset)
+
+    返回:
+        entry: 清单条目字典 (index, name, samples, bytes, seconds)
+    """
+    t0 = time.perf_counter()
+    name = _shard_name(index)
+    final_dir = os.path.join(out_dir, name)
+    tmp_dir = final_dir + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    n = min(config['shard_size'], config['n_samples'] - index * config['shard_size'])
+    dh = dict(config['dh'])
+    dh['offset'] = np.asarray(dh['offset'])
+    lim = np.deg2rad(np.asarray(config['limits_deg']))
+    rng = np.random.default_rng([config['seed'], index])
+
+    fields = config['fields']
+    maps = {key: np.lib.format.open_memmap(os.path.join(tmp_dir, key + '.npy'), mode='w+',
+                                           dtype=dtype, shape=(n,) + tuple(shape))
+            for key, (shape, dtype) in fields.items()}
+
+    # 核函数直接以存储精度计算, 不再先算 float64 再转换; 各字段都由存储的关节角算出
+    dtype = np.dtype(fields['q'][1])
+    for start in range(0, n, config['chunk']):
+        stop = min(start + config['chunk'], n)
+        q = rng.uniform(lim[:, 0], lim[:, 1], (stop - start, 6)).astype(dtype)
+        maps['q'][start:stop] = q
+        maps['pose'][start:stop] = forward_kinematics_batch(q, dh, dtype=dtype, pose_format=config['pose_format'])
+        maps['jacobian'][start:stop] = analytical_jacobian_batch(q, dh, dtype=dtype)
+        maps['branch'][start:stop] = branch_ids_batch(q, dh)
+
+    size = 0
+    for key, m in maps.items():
+        m.flush()
+        size += m.nbytes
+    del maps
+
+    shutil.rmtree(final_dir, ignore_errors=True)
+    os.replace(tmp_dir, final_dir)
+    return {'index': index, 'name': name, 'samples': n, 'bytes': size,
+            'seconds': time.perf_counter() - t0}
+
+
+def _write_manifest(out_dir, manifest):
+    """先写临时文件再替换, 清单始终是完整的 JSON"""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def read_manifest(out_dir):
+    """读取数据集清单, 不存在时返回 None"""
+    path = os.path.join(out_dir, MANIFEST_NAME)
+    if not os.path.exists(path):
+        return None
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def generate_dataset(out_dir, n_samples, shard_size=1 << 20, chunk=1 << 16, seed=0, workers=None,
+                     dh=None, limits_deg=None, pose_format="euler", dtype=np.float32, verbose=True):
+    """
+    生成 (关节角, 末端位姿, 雅可比, 逆解分支编号) 训练数据集, 按固定大小分片写入磁盘
+
+    清单 manifest.json 记录生成配置和已完成的分片; 中断后用相同参数再次调用,
+    只生成清单中缺少的分片, 结果与一次性生成的逐字节相同
+
+    参数:
+        out_dir: 数据集目录
+        n_samples: 样本总数
+        shard_size: 每个分片的样本数
+        chunk: 分片内每次计算的样本数 (每个进程只持有一个数据块)
+        seed: 随机种子
+        workers: 进程数, 默认 os.cpu_count(); 1 时在当前进程中生成
+        dh: DH 参数字典 (mm), 默认 DH_PARAMS
+        limits_deg: 关节限位 (6, 2) (度), 默认 JOINT_LIMITS_DEG
+        pose_format: 位姿格式 "euler" / "quat" / "matrix" (位置单位 mm)
+        dtype: 浮点字段的存储精度
+        verbose: 是否打印每个分片的进度
+
+    返回:
+        manifest: 清单字典
+    """
+    dh = DH_PARAMS if dh is None else dh
+    config = {
+        'n_samples': int(n_samples),
+        'shard_size': int(shard_size),
+        'chunk': int(chunk),
+        'seed': int(seed),
+        'dh': {k: float(dh[k]) for k in ('d1', 'a2', 'a3', 'd4', 'd5', 'd6')},
+        'limits_deg': np.asarray(JOINT_LIMITS_DEG if limits_deg is None else limits_deg).tolist(),
+        'pose_format': pose_format,
+        'fields': dataset_fields(pose_format, dtype),
+    }
+    config['dh']['offset'] = [float(v) for v in dh.get('offset', np.zeros(6))]
+    config = json.loads(json.dumps(config))    # 元组统一为列表, 便于与已有清单比较
+
+    os.makedirs(out_dir, exist_ok=True)
+    manifest = read_manifest(out_dir)
+    if manifest is None:
+        manifest = {'version': MANIFEST_VERSION, 'config': config, 'shards': []}
+    elif manifest['config'] != config:
+        raise ValueError(f"{out_dir} 中已有配置不同的数据集, 请换一个目录或删除后重新生成")
+
+    # 清单中记录但文件已缺失的分片重新生成
+    done = {e['index']: e for e in manifest['shards']
+            if os.path.isdir(os.path.join(out_dir, e['name']))}
+    manifest['shards'] = sorted(done.values(), key=lambda e: e['index'])
+    n_shards = -(-config['n_samples'] // config['shard_size'])
+    pending = [i for i in range(n_shards) if i not in done]
+
+    workers = workers or os.cpu_count() or 1
+    pool = ProcessPoolExecutor(workers) if workers > 1 and len(pending) > 1 else None
+    t0 = time.perf_counter()
+    try:
+        if pool is None:
+            results = (generate_shard(out_dir, i, config) for i in pending)
+        else:
+            results = (f.result() for f in as_completed([pool.submit(generate_shard, out_dir, i, config)
+                                                          for i in pending]))
+        for entry in results:
+            manifest['shards'].append(entry)
+            manifest['shards'].sort(key=lambda e: e['index'])
+            _write_manifest(out_dir, manifest)
+            if verbose:
+                elapsed = time.perf_counter() - t0
+                written = sum(e['bytes'] for e in manifest['shards'] if e['index'] in pending)
+                print(f"  分片 {entry['index'] + 1}/{n_shards} | {entry['samples']:,} 个样本 | "
+                      f"{entry['bytes'] / 2**20:.0f} MB | 累计 {written / 2**20 / elapsed:.0f} MB/s")
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    _write_manifest(out_dir, manifest)
+    return manifest
+
+
+def open_shard(out_dir, entry):
+    """以只读内存映射打开一个分片, 返回 字段名 -> 数组 的字典"""
+    shard_dir = os.path.join(out_dir, entry['name'])
+    return {key[:-4]: np.load(os.path.join(shard_dir, key), mmap_mode='r')
+            for key in sorted(os.listdir(shard_dir)) if key.endswith('.npy')}
+
+
+def iter_dataset(out_dir):
+    """按分片编号顺序逐个以内存映射打开数据集的全部分片"""
+    manifest = read_manifest(out_dir)
+    for entry in manifest['shards']:
+        yield open_shard(out_dir, entry)
+
+
+def verify_dataset_generator(n_samples=1_000_000, shard_size=250_000, seed=0, out_dir=None):
+    """
+    验证数据集生成:
+      1. 分支编号与逆解一致: 逆解能还原的样本, 还原出的分支与编号的肩部、肘部符号都相同,
+         且 4 个编号都出现
+      2. 分片内容与直接调用核函数的结果一致
+      3. 删除一个分片并留下未完成的临时目录, 续跑后与原数据逐字节相同
+
+    参数:
+        n_samples: 样本总数
+        shard_size: 每个分片的样本数
+        seed: 随机种子
+        out_dir: 数据集目录, 默认使用临时目录并在结束后删除
+    """
+    import tempfile
+
+    ik = load_lab3_module('runCalcConstrain')
+
+    # 1. 分支编号 vs 逆解 (IKSolver 长度单位为 m)
+    lim = np.deg2rad(JOINT_LIMITS_DEG)
+    q = np.random.default_rng(seed).uniform(lim[:, 0], lim[:, 1], (20000, 6))
+    poses = forward_kinematics_batch(q, pose_format="euler")
+    poses[:, :3] /= 1000
+    sols, _ = ik.IKSolver([]).solve_batch(poses)
+    dist = np.max(np.abs((sols - q[:, None] + np.pi) % (2 * np.pi) - np.pi), axis=2)
+    dist[np.isnan(dist)] = np.inf
+    found = np.min(dist, axis=1) < 1e-6
+    ik_signs = ik._BRANCH_SIGNS[np.argmin(dist, axis=1)[found]][:, [0, 2]]
+    ids = branch_ids_batch(q[found])
+    id_signs = np.stack([2 * (ids >> 1) - 1, 2 * (ids & 1) - 1], axis=1)
+    branch_ok = bool(np.all(ik_signs == id_signs)) and np.array_equal(np.unique(ids), np.arange(4))
+
+    tmp = None
+    if out_dir is None:
+        tmp = tempfile.mkdtemp(prefix='zju_dataset_')
+        out_dir = tmp
+    try:
+        t0 = time.perf_counter()
+        manifest = generate_dataset(out_dir, n_samples, shard_size=shard_size, seed=seed)
+        elapsed = time.perf_counter() - t0
+        total = sum(e['bytes'] for e in manifest['shards'])
+
+        # 2. 内容抽查
+        first = open_shard(out_dir, manifest['shards'][0])
+        q0 = np.asarray(first['q'][:1000], dtype=np.float64)
+        content_err = max(np.max(np.abs(first['pose'][:1000] - forward_kinematics_batch(q0, pose_format="euler"))),
+                          np.max(np.abs(first['jacobian'][:1000] - analytical_jacobian_batch(q0))))
+        content_ok = content_err < 1e-3 and np.array_equal(first['branch'][:1000], branch_ids_batch(q0))
+        del first
+
+        # 3. 模拟中断后续跑
+        last = manifest['shards'][-1]
+        before = {k: np.array(v) for k, v in open_shard(out_dir, last).items()}
+        shutil.rmtree(os.path.join(out_dir, last['name']))
+        manifest['shards'].pop()
+        _write_manifest(out_dir, manifest)
+        os.makedirs(os.path.join(out_dir, _shard_name(0) + '.tmp'))    # 被中断的临时目录
+        resumed = generate_dataset(out_dir, n_samples, shard_size=shard_size, seed=seed, verbose=False)
+        after = open_shard(out_dir, resumed['shards'][-1])
+        resume_ok = (len(resumed['shards']) == len(manifest['shards']) + 1 and
+                     all(np.array_equal(before[k], after[k]) for k in before))
+        del after
+        n_total = sum(len(s['q']) for s in iter_dataset(out_dir))
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    ok = branch_ok and content_ok and resume_ok and n_total == n_samples
+    print(f"分支编号与逆解一致 ({int(np.sum(found))} 个可还原样本): {branch_ok} | "
+          f"内容误差: {content_err:.2e} | 续跑逐字节一致: {resume_ok}")
+    print(f"{n_samples:,} 个样本 | {total / 2**20:.0f} MB | 耗时 {elapsed:.2f} s | "
+          f"{total / 2**20 / elapsed:.0f} MB/s | {'✓ 通过' if ok else '✗ 失败'}")
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("ZJU-I型机械臂学习型逆解训练数据集生成")
+    print("=" * 80)
+    verify_dataset_generator()
@@ -0,0 +1,369 @@
+import math
+import time
+
+import numpy as np
+
+from lab3_modules import load_lab3_module
+
+# Modified DH 参数表与正运动学共用
+_incremental_fk = load_lab3_module('incremental_fk')
+mdh_table, link_transform_batch = _incremental_fk.mdh_table, _incremental_fk.link_transform_batch
+
+# ZJU-I 型机械臂各连杆惯性参数 (SI 单位)
+#   m: 质量 (kg)
+#   com: 质心在连杆坐标系 i 中的位置 (m)
+#   I: 绕质心、在连杆坐标系 i 中表示的惯性张量 (kg·m²)
+# 数值为按连杆尺寸估算的名义值, 有 CAD 数据或辨识结果时直接替换
+LINK_INERTIA = [
+    {'m': 1.20, 'com': [0.0,     0.0,    -0.040], 'I': np.diag([2.0e-3, 2.0e-3, 1.5e-3])},
+    {'m': 1.00, 'com': [0.0925,  0.0,     0.0],   'I': np.diag([1.0e-3, 4.0e-3, 4.0e-3])},
+    {'m': 0.80, 'com': [0.085,   0.0,     0.0],   'I': np.diag([6.0e-4, 3.0e-3, 3.0e-3])},
+    {'m': 0.40, 'com': [0.0,    -0.035,   0.0],   'I': np.diag([3.0e-4, 2.0e-4, 3.0e-4])},
+    {'m': 0.40, 'com': [0.0,    -0.040,   0.0],   'I': np.diag([3.0e-4, 2.0e-4, 3.0e-4])},
+    {'m': 0.20, 'com': [0.0,     0.0,     0.010], 'I': np.diag([1.0e-4, 1.0e-4, 1.0e-4])},
+]
+
+GRAVITY = np.array([0.0, 0.0, -9.81])
+
+
+def with_payload(inertia, mass, com, I=None):
+    """
+    把末端负载合并到第 6 个连杆上 (平行轴定理)
+
+    参数:
+        inertia: 连杆惯性参数列表, 如 LINK_INERTIA
+        mass: 负载质量 (kg)
+        com: 负载质心在坐标系 6 中的位置 (m)
+        I: 负载绕自身质心的惯性张量 (kg·m²), 默认视为质点
+
+    返回:
+        新的惯性参数列表 (不修改输入)
+    """
+    link = inertia[5]
+    m1, c1, I1 = link['m'], np.asarray(link['com'], dtype=np.float64), np.asarray(link['I'])
+    m2, c2 = mass, np.asarray(com, dtype=np.float64)
+    I2 = np.zeros((3, 3)) if I is None else np.asarray(I)
+
+    m = m1 + m2
+    c = (m1 * c1 + m2 * c2) / m
+
+    def shift(mi, d):
+        return mi * (np.dot(d, d) * np.eye(3) - np.outer(d, d))
+
+    new_link = {'m': m, 'com': c, 'I': I1 + shift(m1, c1 - c) + I2 + shift(m2, c2 - c)}
+    return list(inertia[:5]) + [new_link]
+
+
+# 下面的向量运算以 (x, y, z) 三元组表示向量, 分量可以是 (N,) 数组 (批量) 或 float (单次调用)
+# 结构性的 0 分量 (连杆偏移、质心、惯性张量、为 0 的 qd/qdd) 用同一个对象 _ZERO 表示,
+# 按对象身份判断后直接跳过, 不产生数组运算
+_ZERO = 0.0
+
+
+def _mul(a, b):
+    if a is _ZERO or b is _ZERO:
+        return _ZERO
+    return a * b
+
+
+def _add(a, b):
+    if a is _ZERO:
+        return b
+    if b is _ZERO:
+        return a
+    return a + b
+
+
+def _sub(a, b):
+    if b is _ZERO:
+        return a
+    if a is _ZERO:
+        return -b
+    return a - b
+
+
+def _vadd(a, b):
+    return (_add(a[0], b[0]), _add(a[1], b[1]), _add(a[2], b[2]))
+
+
+def _cross(a, b):
+    return (_sub(_mul(a[1], b[2]), _mul(a[2], b[1])),
+            _sub(_mul(a[2], b[0]), _mul(a[0], b[2])),
+            _sub(_mul(a[0], b[1]), _mul(a[1], b[0])))
+
+
+def _matvec(M, v):
+    return tuple(_add(_add(_mul(M[r][0], v[0]), _mul(M[r][1], v[1])), _mul(M[r][2], v[2])) for r in range(3))
+
+
+def _scale(k, v):
+    return (_mul(k, v[0]), _mul(k, v[1]), _mul(k, v[2]))
+
+
+class InverseDynamics:
+    """
+    ZJU-I 型机械臂递推牛顿-欧拉逆动力学 (Modified DH, Craig 形式)
+
+    常数 (连杆几何、惯性参数) 在构造时展开, 旋转 R_{i-1,i} = Rx(alpha) Rz(theta) 展开为两次平面旋转,
+    alpha 为 0 / ±pi/2 时 Rx 只是交换分量。批量调用按 chunk 分块, 使中间数组留在缓存中;
+    单组调用用 float 走同一套递推, 没有小数组开销。
+    """
+
+    def __init__(self, dh=None, inertia=None, gravity=GRAVITY, chunk=4096):
+        if inertia is None:
+            inertia = LINK_INERTIA
+        table = mdh_table(dh)
+        self.offset = table[:, 3].copy()
+        self.chunk = chunk
+
+        def clean(x):
+            return _ZERO if abs(x) < 1e-12 else float(x)
+
+        self.ca = [clean(np.cos(al)) for al in table[:, 0]]
+        self.sa = [clean(np.sin(al)) for al in table[:, 0]]
+        # 连杆 i 原点在坐标系 i-1 中的位置 (m): [a, -sa*d, ca*d]
+        self.p = [(clean(a / 1000), clean(-sa * d / 1000), clean(ca * d / 1000))
+                  for (a, d), sa, ca in zip(table[:, 1:3], self.sa, self.ca)]
+        self.m = [float(link['m']) for link in inertia]
+        self.c = [tuple(clean(x) for x in link['com']) for link in inertia]
+        self.I = [[[clean(x) for x in row] for row in np.asarray(link['I'])] for link in inertia]
+        # 基座加速度取 -g, 把重力计入递推
+        self.vd0 = tuple(clean(-x) for x in np.asarray(gravity, dtype=np.float64))
+
+    def _to_child(self, i, v, ct, st):
+        """R_{i-1,i}^T v"""
+        ca, sa = self.ca[i], self.sa[i]
+        uy = _add(_mul(ca, v[1]), _mul(sa, v[2]))
+        uz = _sub(_mul(ca, v[2]), _mul(sa, v[1]))
+        return (_add(_mul(ct, v[0]), _mul(st, uy)), _sub(_mul(ct, uy), _mul(st, v[0])), uz)
+
+    def _to_parent(self, i, v, ct, st):
+        """R_{i-1,i} v"""
+        ca, sa = self.ca[i], self.sa[i]
+        ux = _sub(_mul(ct, v[0]), _mul(st, v[1]))
+        uy = _add(_mul(st, v[0]), _mul(ct, v[1]))
+        return (ux, _sub(_mul(ca, uy), _mul(sa, v[2])), _add(_mul(sa, uy), _mul(ca, v[2])))
+
+    def _kernel(self, st, ct, qd, qdd, vd0):
+        """一次递推, st/ct/qd/qdd 为 6 个关节的分量序列 (数组或 float), 返回 6 个关节力矩"""
+        w = (_ZERO, _ZERO, _ZERO)
+        wd = (_ZERO, _ZERO, _ZERO)
+        vd = vd0
+        F, Nm = [], []
+        for i in range(6):
+            p = self.p[i]
+            vd = self._to_child(i, _vadd(_vadd(_cross(wd, p), _cross(w, _cross(w, p))), vd), ct[i], st[i])
+            w_c = self._to_child(i, w, ct[i], st[i])
+            wd = self._to_child(i, wd, ct[i], st[i])
+            # w_c x (0, 0, qd) = (w_c.y * qd, -w_c.x * qd, 0)
+            wd = (_add(wd[0], _mul(w_c[1], qd[i])), _sub(wd[1], _mul(w_c[0], qd[i])), _add(wd[2], qdd[i]))
+            w = (w_c[0], w_c[1], _add(w_c[2], qd[i]))
+
+            c, I = self.c[i], self.I[i]
+            vdc = _vadd(_vadd(_cross(wd, c), _cross(w, _cross(w, c))), vd)
+            F.append(_scale(self.m[i], vdc))
+            Nm.append(_vadd(_matvec(I, wd), _cross(w, _matvec(I, w))))
+
+        tau = [_ZERO] * 6
+        f = (_ZERO, _ZERO, _ZERO)
+        n = (_ZERO, _ZERO, _ZERO)
+        for i in range(5, -1, -1):
+            if i < 5:
+                f_p = self._to_parent(i + 1, f, ct[i + 1], st[i + 1])
+                n = _vadd(self._to_parent(i + 1, n, ct[i + 1], st[i + 1]), _cross(self.p[i + 1], f_p))
+                f = f_p
+            n = _vadd(_vadd(n, Nm[i]), _cross(self.c[i], F[i]))
+            f = _vadd(f, F[i])
+            tau[i] = n[2]
+        return tau
+
+    def rnea(self, q, qd, qdd):
+        """
+        单组逆动力学 (float 递推, 适合控制周期内调用)
+
+        参数:
+            q, qd, qdd: 关节角度、角速度、角加速度 (6,)
+
+        返回:
+            tau: (6,) 关节力矩 (N·m)
+        """
+        theta = [float(x) + o for x, o in zip(q, self.offset)]
+        st = [math.sin(x) for x in theta]
+        ct = [math.cos(x) for x in theta]
+        tau = self._kernel(st, ct, [float(x) for x in qd], [float(x) for x in qdd], self.vd0)
+        return np.array(tau)
+
+    def rnea_batch(self, q, qd=None, qdd=None, gravity=True):
+        """
+        批量逆动力学
+
+        参数:
+            q: 关节角度 (N, 6) 或 (6,) (弧度)
+            qd: 关节角速度 (N, 6) (弧度/秒), None 表示全为 0 (对应的项直接跳过)
+            qdd: 关节角加速度 (N, 6) (弧度/秒²), None 表示全为 0
+            gravity: 是否计入重力
+
+        返回:
+            tau: (N, 6) 关节力矩 (N·m)
+        """
+        q = np.asarray(q, dtype=np.float64).reshape(-1, 6)
+        n = len(q)
+        theta = (q + self.offset).T
+
+        def rows(x):
+            if x is None:
+                return None
+            return np.ascontiguousarray(np.broadcast_to(np.asarray(x, dtype=np.float64).reshape(-1, 6), (n, 6)).T)
+
+        qd, qdd = rows(qd), rows(qdd)
+        vd0 = self.vd0 if gravity else (_ZERO, _ZERO, _ZERO)
+        zeros = [_ZERO] * 6
+
+        tau = np.empty((6, n))
+        for start in range(0, n, self.chunk):
+            sl = slice(start, start + self.chunk)
+            th = theta[:, sl]
+            out = self._kernel(np.sin(th), np.cos(th),
+                               zeros if qd is None else qd[:, sl],
+                               zeros if qdd is None else qdd[:, sl], vd0)
+            for i in range(6):
+                tau[i, sl] = out[i]
+        return tau.T
+
+    def gravity_torque_batch(self, q):
+        """
+        批量重力补偿力矩 G(q) (qd = qdd = 0 时的 rnea, 速度和加速度项不参与计算)
+
+        参数:
+            q: 关节角度 (N, 6) 或 (6,) (弧度)
+
+        返回:
+            tau: (N, 6) (N·m)
+        """
+        return self.rnea_batch(q)
+
+    def mass_matrix_batch(self, q):
+        """
+        批量关节空间质量矩阵 M(q): 第 j 列为 qd = 0, qdd = e_j, 无重力时的力矩
+        e_j 以 float 常数传入递推, 每列只计算与关节 j 相关的项
+
+        参数:
+            q: 关节角度 (N, 6) 或 (6,) (弧度)
+
+        返回:
+            M: (N, 6, 6) (kg·m²)
+        """
+        q = np.asarray(q, dtype=np.float64).reshape(-1, 6)
+        n = len(q)
+        theta = (q + self.offset).T
+        zeros = [_ZERO] * 6
+        M = np.empty((n, 6, 6))
+        for start in range(0, n, self.chunk):
+            sl = slice(start, start + self.chunk)
+            th = theta[:, sl]
+            st, ct = np.sin(th), np.cos(th)
+            for j in range(6):
+                qdd = [1.0 if k == j else _ZERO for k in range(6)]
+                out = self._kernel(st, ct, zeros, qdd, (_ZERO, _ZERO, _ZERO))
+                for i in range(6):
+                    M[sl, i, j] = out[i]
+        return M
+
+
+def potential_energy_batch(q, dh=None, inertia=None, gravity=GRAVITY):
+    """
+    批量计算重力势能 (J), 用于验证 gravity_torque_batch = dV/dq
+
+    参数:
+        q: 关节角度 (N, 6) (弧度)
+
+    返回:
+        V: (N,)
+    """
+    if inertia is None:
+        inertia = LINK_INERTIA
+    table = mdh_table(dh)
+    table[:, 1:3] /= 1000
+    q = np.asarray(q, dtype=np.float64).reshape(-1, 6)
+
+    V = np.zeros(len(q))
+    T = np.eye(4)
+    for i in range(6):
+        T = T @ link_transform_batch(table[i], q[:, i])
+        c = T[:, :3, :3] @ np.asarray(inertia[i]['com'], dtype=np.float64) + T[:, :3, 3]
+        V -= inertia[i]['m'] * (c @ np.asarray(gravity))
+    return V
+
+
+def verify_dynamics(n=100000, seed=0, eps=1e-6):
+    """
+    验证逆动力学:
+        1. 质量矩阵对称正定
+        2. G(q) 等于势能的梯度
+        3. 功率平衡 qd·tau = d/dt(1/2 qd'M qd) + qd·G (含科氏力/离心力项)
+    并测量单次调用频率和批量吞吐
+
+    参数:
+        n: 批量吞吐测试的样本数
+        seed: 随机种子
+        eps: 差分步长
+    """
+    rng = np.random.default_rng(seed)
+    dyn = InverseDynamics()
+    m = 200
+    q = rng.uniform(-np.pi, np.pi, (m, 6))
+    qd = rng.uniform(-2, 2, (m, 6))
+    qdd = rng.uniform(-5, 5, (m, 6))
+
+    M = dyn.mass_matrix_batch(q)
+    sym_err = np.max(np.abs(M - M.transpose(0, 2, 1)))
+    min_eig = np.min(np.linalg.eigvalsh(M))
+
+    G = dyn.gravity_torque_batch(q)
+    G_fd = np.empty_like(G)
+    for k in range(6):
+        dq = np.zeros(6)
+        dq[k] = eps
+        G_fd[:, k] = (potential_energy_batch(q + dq) - potential_energy_batch(q - dq)) / (2 * eps)
+    g_err = np.max(np.abs(G - G_fd))
+
+    # 沿 q(t) = q + t*qd + t²/2*qdd 的动能变化率
+    def kinetic(t):
+        qt = q + t * qd + 0.5 * t**2 * qdd
+        qdt = qd + t * qdd
+        return 0.5 * np.einsum('ni,nij,nj->n', qdt, dyn.mass_matrix_batch(qt), qdt)
+
+    tau = dyn.rnea_batch(q, qd, qdd)
+    single_err = max(np.max(np.abs(dyn.rnea(q[i], qd[i], qdd[i]) - tau[i])) for i in range(20))
+    power = np.sum(qd * tau, axis=1)
+    power_ref = (kinetic(eps) - kinetic(-eps)) / (2 * eps) + np.sum(qd * G, axis=1)
+    p_err = np.max(np.abs(power - power_ref))
+
+    ok = single_err < 1e-12 and sym_err < 1e-12 and min_eig > 0 and g_err < 1e-6 and p_err < 1e-5
+
+    # 单次调用频率
+    q1, qd1, qdd1 = q[0], qd[0], qdd[0]
+    t0 = time.perf_counter()
+    for _ in range(1000):
+        dyn.rnea(q1, qd1, qdd1)
+    t_single = (time.perf_counter() - t0) / 1000
+
+    # 批量吞吐
+    qb = rng.uniform(-np.pi, np.pi, (n, 6))
+    t0 = time.perf_counter()
+    dyn.rnea_batch(qb, qb, qb)
+    t_batch = time.perf_counter() - t0
+
+    print(f"单次/批量差异: {single_err:.2e}")
+    print(f"M 对称误差: {sym_err:.2e} | M 最小特征值: {min_eig:.2e} | G 梯度误差: {g_err:.2e} | "
+          f"功率平衡误差: {p_err:.2e} | {'✓ 通过' if ok else '✗ 失败'}")
+    print(f"单次调用: {t_single * 1e6:.0f} us ({1 / t_single:.0f} Hz)")
+    print(f"批量 {n} 组: {t_batch * 1e3:.1f} ms ({n / t_batch / 1e6:.2f} M 样本/秒)")
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("ZJU-I型机械臂逆动力学 (递推牛顿-欧拉) 验证")
+    print("=" * 80)
+    verify_dynamics()
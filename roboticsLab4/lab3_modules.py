@@ -0,0 +1,44 @@
+import importlib.util
+import os
+import sys
+
+# 本实验复用的 roboticsLab3 模块: 模块名 -> (所在子目录, 该模块顶层 import 的其他 roboticsLab3 模块)
+LAB3_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'roboticsLab3')
+LAB3_MODULES = {
+    'pose_convert': ('InverseKinematics', ()),
+    'runCalcConstrain': ('InverseKinematics', ('pose_convert',)),
+    'incremental_fk': ('ForwardKinematics', ()),
+}
+
+
+def load_lab3_module(name):
+    """
+    按文件路径加载 roboticsLab3 中的模块, 不修改 sys.path
+
+    模块以原名登记在 sys.modules 中, 因此 runCalcConstrain 顶层的 from pose_convert import ...
+    和进程池对其中函数的序列化都能照常工作; 重复调用直接返回已加载的模块
+
+    参数:
+        name: 模块名, 见 LAB3_MODULES
+
+    返回:
+        module: 已加载的模块
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    if name not in LAB3_MODULES:
+        raise ValueError(f"未知的 roboticsLab3 模块: {name}, 可选 {sorted(LAB3_MODULES)}")
+
+    subdir, deps = LAB3_MODULES[name]
+    for dep in deps:
+        load_lab3_module(dep)
+
+    spec = importlib.util.spec_from_file_location(name, os.path.join(LAB3_DIR, subdir, name + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    try:
+        spec.loader.exec_module(module)
+    except BaseException:
+        del sys.modules[name]
+        raise
+    return module
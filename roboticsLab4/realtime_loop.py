@@ -0,0 +1,469 @@
+import gc
+import math
+import os
+import time
+
+import numpy as np
+
+from Jacobbi_Test import DH_PARAMS, forward_kinematics_batch, analytical_jacobian_batch
+
+
+class ResolvedRateController:
+    """
+    分解速度 (resolved-rate) 控制器, 用于实时循环
+
+    全部缓冲区 (末端位姿、雅可比、阻尼最小二乘的正规方程和中间向量) 在构造时分配为定长列表,
+    每个控制周期只做 math 标量运算并原地写入, 不创建任何数组或容器对象
+    """
+
+    def __init__(self, dh=None, damping=0.05, kp=20.0, kr=20.0, qd_max=2.0):
+        """
+        参数:
+            dh: DH 参数字典 (mm), 默认 DH_PARAMS, 可带 'offset'
+            damping: 阻尼最小二乘的阻尼系数 lambda
+            kp: 位置误差增益 (1/s)
+            kr: 姿态误差增益 (1/s)
+            qd_max: 关节速度上限 (弧度/秒), 超出时整体等比例缩小
+        """
+        dh = DH_PARAMS if dh is None else dh
+        self.d1, self.a2, self.a3, self.d4, self.d5, self.d6 = (
+            float(dh[k]) for k in ('d1', 'a2', 'a3', 'd4', 'd5', 'd6'))
+        self.offset = [float(v) for v in dh.get('offset', np.zeros(6))]
+        self.lam2 = damping ** 2
+        self.kp, self.kr, self.qd_max = kp, kr, qd_max
+
+        self.p = [0.0] * 3      # 末端位置 (mm)
+        self.R = [0.0] * 9      # 末端姿态, 行优先
+        self.J = [0.0] * 36     # 雅可比, 行优先
+        self.qd = [0.0] * 6     # 关节速度指令
+        self._e = [0.0] * 6     # 末端速度指令 [v; w]
+        self._L = [0.0] * 36    # J J^T + lambda^2 I 的 Cholesky 因子 (下三角)
+        self._y = [0.0] * 6
+
+    def update(self, q):
+        """计算 q 处的正运动学和雅可比, 写入 self.p / self.R / self.J, 公式与批量核函数相同"""
+        d1, a2, a3, d4, d5, d6 = self.d1, self.a2, self.a3, self.d4, self.d5, self.d6
+        off = self.offset
+        q1, q2, q3 = q[0] + off[0], q[1] + off[1], q[2] + off[2]
+        q4, q5, q6 = q[3] + off[3], q[4] + off[4], q[5] + off[5]
+        s1, c1 = math.sin(q1), math.cos(q1)
+        s2, c2 = math.sin(q2), math.cos(q2)
+        s23, c23 = math.sin(q2 + q3), math.cos(q2 + q3)
+        s234, c234 = math.sin(q2 + q3 + q4), math.cos(q2 + q3 + q4)
+        s5, c5 = math.sin(q5), math.cos(q5)
+        s6, c6 = math.sin(q6), math.cos(q6)
+
+        # 正运动学
+        u = c234 * s5 * c6 - s234 * s6
+        v = c234 * s5 * s6 + s234 * c6
+        w = c234 * c5
+        R = self.R
+        R[0] = -c1 * u - s1 * c5 * c6
+        R[1] = c1 * v + s1 * c5 * s6
+        R[2] = c1 * w - s1 * s5
+        R[3] = -s1 * u + c1 * c5 * c6
+        R[4] = s1 * v - c1 * c5 * s6
+        R[5] = s1 * w + c1 * s5
+        R[6] = c234 * s6 + s234 * s5 * c6
+        R[7] = c234 * c6 - s234 * s5 * s6
+        R[8] = -s234 * c5
+
+        r = a2 * s2 + a3 * s23 + d5 * s234 + d6 * w
+        h = d4 + d6 * s5
+        p = self.p
+        p[0] = c1 * r - s1 * h
+        p[1] = s1 * r + c1 * h
+        p[2] = a2 * c2 + a3 * c23 + d5 * c234 + d1 - d6 * s234 * c5
+
+        # 雅可比
+        J = self.J
+        J[0], J[6], J[12], J[18], J[24], J[30] = -s1 * r - c1 * h, c1 * r - s1 * h, 0.0, 0.0, 0.0, 1.0
+
+        cm4 = -d6 * s234 * c5 + d5 * c234
+        z4 = -d5 * s234 - d6 * w
+        cm3 = cm4 + a3 * c23
+        z3 = z4 - a3 * s23
+        cm2 = cm3 + a2 * c2
+        z2 = z3 - a2 * s2
+        J[1], J[7], J[13], J[19], J[25], J[31] = c1 * cm2, s1 * cm2, z2, -s1, c1, 0.0
+        J[2], J[8], J[14], J[20], J[26], J[32] = c1 * cm3, s1 * cm3, z3, -s1, c1, 0.0
+        J[3], J[9], J[15], J[21], J[27], J[33] = c1 * cm4, s1 * cm4, z4, -s1, c1, 0.0
+
+        J[4] = -d6 * (s1 * c5 + s5 * c1 * c234)
+        J[10] = d6 * (c1 * c5 - s1 * s5 * c234)
+        J[16] = d6 * s5 * s234
+        J[22], J[28], J[34] = s234 * c1, s1 * s234, c234
+
+        J[5], J[11], J[17] = 0.0, 0.0, 0.0
+        J[23], J[29], J[35] = R[2], R[5], R[8]
+
+    def dls(self, e, out):
+        """
+        阻尼最小二乘: out = J^T (J J^T + lambda^2 I)^-1 e, 使用 update 最近一次写入的雅可比
+
+        J J^T + lambda^2 I 对称正定, 用原地 Cholesky 分解求解
+
+        参数:
+            e: 末端速度 [v (mm/s); w (rad/s)], 长度 6
+            out: 关节速度输出缓冲区, 长度 6
+        """
+        J, L, y = self.J, self._L, self._y
+
+        # L <- J J^T + lambda^2 I 的 Cholesky 因子 (按列计算, 只用下三角)
+        for i in range(6):
+            ri = 6 * i
+            for j in range(i + 1):
+                rj = 6 * j
+                s = (J[ri] * J[rj] + J[ri + 1] * J[rj + 1] + J[ri + 2] * J[rj + 2] +
+                     J[ri + 3] * J[rj + 3] + J[ri + 4] * J[rj + 4] + J[ri + 5] * J[rj + 5])
+                for k in range(j):
+                    s -= L[ri + k] * L[rj + k]
+                if i == j:
+                    L[ri + i] = math.sqrt(s + self.lam2)
+                else:
+                    L[ri + j] = s / L[rj + j]
+
+        # L L^T y = e
+        for i in range(6):
+            s = e[i]
+            for k in range(i):
+                s -= L[6 * i + k] * y[k]
+            y[i] = s / L[7 * i]
+        for i in range(5, -1, -1):
+            s = y[i]
+            for k in range(i + 1, 6):
+                s -= L[6 * k + i] * y[k]
+            y[i] = s / L[7 * i]
+
+        # out = J^T y
+        for c in range(6):
+            out[c] = (J[c] * y[0] + J[6 + c] * y[1] + J[12 + c] * y[2] +
+                      J[18 + c] * y[3] + J[24 + c] * y[4] + J[30 + c] * y[5])
+
+    def step(self, q, p_des, R_des, v_ff=None):
+        """
+        一个控制周期: 正运动学 + 雅可比 + 阻尼最小二乘, 返回关节速度指令 self.qd (原地更新)
+
+        姿态误差取 R_des R^T 的反对称部分 (与 calibration.pose_error_batch 相同)
+
+        参数:
+            q: 当前关节角, 长度 6 (弧度)
+            p_des: 期望末端位置, 长度 3 (mm)
+            R_des: 期望末端姿态, 长度 9 (行优先)
+            v_ff: 可选的末端速度前馈 [v; w], 长度 6
+        """
+        self.update(q)
+        p, R, e = self.p, self.R, self._e
+
+        e[0] = self.kp * (p_des[0] - p[0])
+        e[1] = self.kp * (p_des[1] - p[1])
+        e[2] = self.kp * (p_des[2] - p[2])
+
+        # dR[i][j] = sum_k R_des[i][k] * R[j][k]
+        d01 = R_des[0] * R[3] + R_des[1] * R[4] + R_des[2] * R[5]
+        d02 = R_des[0] * R[6] + R_des[1] * R[7] + R_des[2] * R[8]
+        d10 = R_des[3] * R[0] + R_des[4] * R[1] + R_des[5] * R[2]
+        d12 = R_des[3] * R[6] + R_des[4] * R[7] + R_des[5] * R[8]
+        d20 = R_des[6] * R[0] + R_des[7] * R[1] + R_des[8] * R[2]
+        d21 = R_des[6] * R[3] + R_des[7] * R[4] + R_des[8] * R[5]
+        e[3] = 0.5 * self.kr * (d21 - d12)
+        e[4] = 0.5 * self.kr * (d02 - d20)
+        e[5] = 0.5 * self.kr * (d10 - d01)
+
+        if v_ff is not None:
+            for i in range(6):
+                e[i] += v_ff[i]
+
+        qd = self.qd
+        self.dls(e, qd)
+
+        peak = max(abs(qd[0]), abs(qd[1]), abs(qd[2]), abs(qd[3]), abs(qd[4]), abs(qd[5]))
+        if peak > self.qd_max:
+            scale = self.qd_max / peak
+            for i in range(6):
+                qd[i] *= scale
+        return qd
+
+
+class SimulatedPlant:
+    """
+    仿真被控对象: 各关节速度以一阶惯性跟踪速度指令, 状态保存在定长列表中原地积分
+    """
+
+    def __init__(self, q0, dt=1e-3, tau=5e-3):
+        """
+        参数:
+            q0: 初始关节角, 长度 6 (弧度)
+            dt: 积分步长 (秒), 与控制周期相同
+            tau: 关节速度响应时间常数 (秒)
+        """
+        self.q = [float(v) for v in q0]
+        self.qd = [0.0] * 6
+        self.alpha = dt / (tau + dt)
+        self.dt = dt
+
+    def apply(self, qd_cmd):
+        """执行一个周期的速度指令"""
+        q, qd, a, dt = self.q, self.qd, self.alpha, self.dt
+        for i in range(6):
+            qd[i] += a * (qd_cmd[i] - qd[i])
+            q[i] += qd[i] * dt
+
+
+class LatencyHistogram:
+    """定长直方图 (计数列表), 记录每个周期的耗时, 超出范围的计入最后一格"""
+
+    def __init__(self, bin_ns=1000, n_bins=10000):
+        self.bin_ns = bin_ns
+        self.counts = [0] * (n_bins + 1)
+        self.n = 0
+        self.total_ns = 0
+        self.max_ns = 0
+
+    def add(self, ns):
+        b = ns // self.bin_ns
+        self.counts[b if b < len(self.counts) else -1] += 1
+        self.n += 1
+        self.total_ns += ns
+        if ns > self.max_ns:
+            self.max_ns = ns
+
+    def percentile(self, pct):
+        """第 pct 百分位数所在格的上沿 (ns)"""
+        target = math.ceil(self.n * pct / 100)
+        acc = 0
+        for b, c in enumerate(self.counts):
+            acc += c
+            if acc >= target:
+                return (b + 1) * self.bin_ns
+        return self.max_ns
+
+    def summary(self):
+        """常用统计量 (微秒)"""
+        return {
+            'mean_us': self.total_ns / max(self.n, 1) / 1e3,
+            'p50_us': self.percentile(50) / 1e3,
+            'p99_us': self.percentile(99) / 1e3,
+            'p999_us': self.percentile(99.9) / 1e3,
+            'max_us': self.max_ns / 1e3,
+        }
+
+
+def circle_target(center, radius, freq, axis=(0, 1)):
+    """
+    生成圆周轨迹目标函数 target(t, p_out, v_out), 在 center 附近由 axis 指定的两个坐标轴构成的平面内画圆,
+    同时写入期望位置和末端速度前馈 (角速度为 0)
+
+    参数:
+        center: 圆心 (mm)
+        radius: 半径 (mm)
+        freq: 频率 (Hz)
+        axis: 圆所在平面的两个坐标轴编号
+    """
+    cx, cy, cz = (float(v) for v in center)
+    i, j = axis
+    w = 2 * math.pi * freq
+
+    def target(t, p_out, v_out):
+        c, s = math.cos(w * t), math.sin(w * t)
+        p_out[0], p_out[1], p_out[2] = cx, cy, cz
+        p_out[i] += radius * (c - 1)
+        p_out[j] += radius * s
+        v_out[0] = v_out[1] = v_out[2] = 0.0
+        v_out[i] = -radius * w * s
+        v_out[j] = radius * w * c
+
+    return target
+
+
+def _set_realtime_priority(priority):
+    """尝试切换到 SCHED_FIFO, 返回原调度策略 (用于恢复); 无权限或平台不支持时返回 None"""
+    try:
+        old = (os.sched_getscheduler(0), os.sched_getparam(0))
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        return old
+    except (AttributeError, PermissionError, OSError):
+        return None
+
+
+def run_realtime_loop(controller, plant, target, R_des, cycles, period=1e-3, spin_ns=200_000,
+                      rt_priority=None, freeze_gc=True):
+    """
+    固定周期实时控制循环: 等待下一周期起点 -> 目标 -> 控制器 -> 被控对象, 记录每周期耗时和截止时间超限
+
+    等待时先 time.sleep 到周期起点前 spin_ns, 最后一段忙等, 减小唤醒抖动;
+    循环前做一次完整 GC 并冻结已有对象、关闭自动 GC, 循环中不会触发回收
+
+    参数:
+        controller: ResolvedRateController
+        plant: SimulatedPlant (或有 q 属性和 apply 方法的真实机械臂接口)
+        target: 目标函数 target(t, p_out, v_out), 见 circle_target
+        R_des: 期望末端姿态, 长度 9 (行优先)
+        cycles: 周期数
+        period: 控制周期 (秒)
+        spin_ns: 忙等时长 (纳秒)
+        rt_priority: SCHED_FIFO 优先级 (1 ~ 99), None 表示不切换
+        freeze_gc: 是否在循环期间冻结并关闭 GC
+
+    返回:
+        stats: 字典 (compute / wakeup 直方图统计, misses, overruns, max_err_mm, gc_collections, realtime)
+    """
+    period_ns = int(period * 1e9)
+    compute = LatencyHistogram()
+    wakeup = LatencyHistogram()
+    p_des = [0.0] * 3
+    v_ff = [0.0] * 6
+    misses = 0
+    overruns = 0
+    max_err = 0.0
+
+    n_gc = [0]
+
+    def on_gc(phase, info):
+        if phase == 'start':
+            n_gc[0] += 1
+
+    old_policy = _set_realtime_priority(rt_priority) if rt_priority else None
+    gc_enabled = gc.isenabled()
+    if freeze_gc:
+        gc.collect()
+        gc.freeze()
+        gc.disable()
+    gc.callbacks.append(on_gc)
+
+    clock = time.perf_counter_ns
+    sleep = time.sleep
+    q = plant.q
+    p = controller.p
+    try:
+        next_ns = clock() + period_ns
+        for k in range(cycles):
+            remaining = next_ns - clock()
+            if remaining > spin_ns:
+                sleep((remaining - spin_ns) * 1e-9)
+            while clock() < next_ns:
+                pass
+
+            start = clock()
+            target(k * period, p_des, v_ff)
+            plant.apply(controller.step(q, p_des, R_des, v_ff))
+            end = clock()
+
+            wakeup.add(start - next_ns)
+            compute.add(end - start)
+            if end > next_ns + period_ns:
+                misses += 1
+
+            err = math.sqrt((p_des[0] - p[0]) ** 2 + (p_des[1] - p[1]) ** 2 + (p_des[2] - p[2]) ** 2)
+            if err > max_err and k * period > 0.2:    # 跳过起始过渡段
+                max_err = err
+
+            next_ns += period_ns
+            while next_ns < end:    # 超出整个周期时跳过错过的周期起点
+                next_ns += period_ns
+                overruns += 1
+    finally:
+        gc.callbacks.remove(on_gc)
+        if freeze_gc:
+            gc.unfreeze()
+            if gc_enabled:
+                gc.enable()
+        if old_policy is not None:
+            os.sched_setscheduler(0, old_policy[0], old_policy[1])
+
+    return {'compute': compute.summary(), 'wakeup': wakeup.summary(), 'misses': misses,
+            'overruns': overruns, 'max_err_mm': max_err, 'gc_collections': n_gc[0],
+            'realtime': old_policy is not None}
+
+
+def verify_realtime_loop(cycles=3000, seed=0):
+    """
+    验证实时循环:
+      1. 标量正运动学 / 雅可比 / 阻尼最小二乘与批量核函数和 numpy 公式一致
+      2. 控制周期内不分配数组 (tracemalloc 峰值), 与每周期新建数组的写法比较耗时
+      3. 1 kHz 跟踪仿真圆周轨迹, 输出耗时直方图统计和截止时间超限次数
+
+    参数:
+        cycles: 实时循环周期数
+        seed: 随机种子
+    """
+    import tracemalloc
+
+    from Jacobbi_Test import analytical_jacobian
+
+    rng = np.random.default_rng(seed)
+    ctrl = ResolvedRateController()
+
+    # 1. 数值一致性
+    qs = rng.uniform(-np.pi, np.pi, (200, 6))
+    T = forward_kinematics_batch(qs)
+    Jb = analytical_jacobian_batch(qs)
+    e = rng.normal(0, 10, 6)
+    out = [0.0] * 6
+    kin_err = dls_err = 0.0
+    for qi, Ti, Ji in zip(qs, T, Jb):
+        ctrl.update(qi.tolist())
+        kin_err = max(kin_err, np.max(np.abs(np.array(ctrl.p) - Ti[:3, 3])),
+                      np.max(np.abs(np.array(ctrl.R) - Ti[:3, :3].ravel())),
+                      np.max(np.abs(np.array(ctrl.J) - Ji.ravel())))
+        ctrl.dls(e.tolist(), out)
+        ref = Ji.T @ np.linalg.solve(Ji @ Ji.T + ctrl.lam2 * np.eye(6), e)
+        dls_err = max(dls_err, np.max(np.abs(np.array(out) - ref)) / max(1.0, np.max(np.abs(ref))))
+
+    # 初始位形与目标: 在初始末端位置附近的竖直平面内画圆, 姿态保持不变
+    q0 = [0.0, 0.3, 1.0, 0.3, 0.5, 0.0]
+    ctrl.update(q0)
+    R_des = list(ctrl.R)
+    target = circle_target(ctrl.p, radius=50.0, freq=0.5, axis=(0, 2))
+    p_des = [0.0] * 3
+    v_ff = [0.0] * 6
+
+    def numpy_step(q, p_des, v_ff):
+        """对照: 每周期新建雅可比和中间数组的写法"""
+        J = analytical_jacobian(np.asarray(q))
+        ev = np.array(v_ff)
+        ev[:3] += ctrl.kp * (np.asarray(p_des) - forward_kinematics_batch(np.asarray(q))[0, :3, 3])
+        return J.T @ np.linalg.solve(J @ J.T + ctrl.lam2 * np.eye(6), ev)
+
+    # 2. 每周期内存分配与耗时 (离线, 不等待)
+    def profile(step, n=2000):
+        plant = SimulatedPlant(q0)
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        for k in range(200):
+            target(k * 1e-3, p_des, v_ff)
+            plant.apply(step(plant.q, p_des, v_ff))
+        peak = tracemalloc.get_traced_memory()[1] - base
+        tracemalloc.stop()
+        t0 = time.perf_counter_ns()
+        for k in range(n):
+            target(k * 1e-3, p_des, v_ff)
+            plant.apply(step(plant.q, p_des, v_ff))
+        return peak, (time.perf_counter_ns() - t0) / n / 1e3
+
+    peak_rt, t_rt = profile(lambda q, pd, vf: ctrl.step(q, pd, R_des, vf))
+    peak_np, t_np = profile(numpy_step)
+
+    # 3. 1 kHz 实时循环
+    plant = SimulatedPlant(q0)
+    stats = run_realtime_loop(ctrl, plant, target, R_des, cycles, rt_priority=50)
+
+    ok = kin_err < 1e-9 and dls_err < 1e-9 and peak_rt < 4096 and stats['max_err_mm'] < 1.0
+    c, w = stats['compute'], stats['wakeup']
+    print(f"标量运动学误差: {kin_err:.2e} | 阻尼最小二乘相对误差: {dls_err:.2e}")
+    print(f"每周期 | 原地计算: {t_rt:.1f} us, 分配峰值 {peak_rt} B | "
+          f"numpy 新建数组: {t_np:.1f} us, 分配峰值 {peak_np} B")
+    print(f"{cycles} 个周期 @ 1 kHz (SCHED_FIFO: {stats['realtime']}) | "
+          f"计算耗时 p50/p99/p99.9/max: {c['p50_us']:.0f}/{c['p99_us']:.0f}/{c['p999_us']:.0f}/{c['max_us']:.0f} us")
+    print(f"唤醒延迟 p50/p99/max: {w['p50_us']:.0f}/{w['p99_us']:.0f}/{w['max_us']:.0f} us | "
+          f"截止时间超限: {stats['misses']} | 跳过周期: {stats['overruns']} | GC 次数: {stats['gc_collections']}")
+    print(f"圆周跟踪最大位置误差: {stats['max_err_mm']:.3f} mm | {'✓ 通过' if ok else '✗ 失败'}")
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("ZJU-I型机械臂实时分解速度控制循环验证 (仿真被控对象)")
+    print("=" * 80)
+    verify_realtime_loop()
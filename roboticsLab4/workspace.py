@@ -0,0 +1,365 @@
+import itertools
+import json
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from Jacobbi_Test import DH_PARAMS, forward_kinematics_batch
+
+# 关节限位 (度), 与 runCalcConstrain.IKSolver 的默认限位一致
+JOINT_LIMITS_DEG = np.array([
+    [-180, 180],  # J1
+    [-90, 90],    # J2
+    [-150, 150],  # J3
+    [-180, 180],  # J4
+    [-120, 120],  # J5
+    [-360, 360],  # J6
+])
+
+# 体素坐标打包成一个 int64 键: 每轴 21 位, 加偏置后为非负数
+_AXIS_BITS = 21
+_AXIS_BIAS = 1 << (_AXIS_BITS - 1)
+_AXIS_MASK = (1 << _AXIS_BITS) - 1
+
+# 末端 z 轴 (接近方向) 的等面积方向分箱: cos 极角均分 8 带 x 方位角均分 8 扇区 = 64 箱, 正好一个 uint64 位掩码
+ORIENT_BANDS = 8
+ORIENT_SECTORS = 8
+N_ORIENT_BINS = ORIENT_BANDS * ORIENT_SECTORS
+
+
+def pack_voxel_keys(ijk):
+    """体素整数坐标 (N, 3) -> int64 键 (N,)"""
+    ijk = np.asarray(ijk, dtype=np.int64) + _AXIS_BIAS
+    return (ijk[:, 0] << (2 * _AXIS_BITS)) | (ijk[:, 1] << _AXIS_BITS) | ijk[:, 2]
+
+
+def unpack_voxel_keys(keys):
+    """int64 键 (N,) -> 体素整数坐标 (N, 3)"""
+    keys = np.asarray(keys, dtype=np.int64)
+    ijk = np.stack([keys >> (2 * _AXIS_BITS), (keys >> _AXIS_BITS) & _AXIS_MASK, keys & _AXIS_MASK], axis=1)
+    return ijk - _AXIS_BIAS
+
+
+def orientation_bins(z_axis):
+    """
+    末端接近方向 -> 方向箱编号
+
+    参数:
+        z_axis: (N, 3) 单位向量 (末端坐标系 z 轴在基坐标系中的方向)
+
+    返回:
+        bins: (N,) 0 ~ N_ORIENT_BINS-1
+    """
+    band = np.clip(((z_axis[:, 2] + 1) * (ORIENT_BANDS / 2)).astype(np.int64), 0, ORIENT_BANDS - 1)
+    phi = np.arctan2(z_axis[:, 1], z_axis[:, 0])
+    sector = np.clip(((phi + np.pi) * (ORIENT_SECTORS / (2 * np.pi))).astype(np.int64), 0, ORIENT_SECTORS - 1)
+    return band * ORIENT_SECTORS + sector
+
+
+def _reduce_voxels(keys, counts, masks):
+    """合并重复键: 计数相加, 方向掩码按位或; 返回按键升序排列的稀疏体素"""
+    order = np.argsort(keys, kind='stable')
+    keys, counts, masks = keys[order], counts[order], masks[order]
+    start = np.flatnonzero(np.concatenate([[True], keys[1:] != keys[:-1]]))
+    return keys[start], np.add.reduceat(counts, start), np.bitwise_or.reduceat(masks, start)
+
+
+def sample_chunk(seed, chunk, size, voxel, dh=None, limits_deg=None):
+    """
+    在关节限位内均匀采样一个数据块并体素化 (可在子进程中运行)
+
+    参数:
+        seed: 随机种子序列 (数据块编号参与其中, 结果与进程数无关)
+        chunk: 数据块编号
+        size: 样本数
+        voxel: 体素边长 (mm)
+        dh: DH 参数字典 (mm)
+        limits_deg: 关节限位 (6, 2) (度)
+
+    返回:
+        keys, counts, masks: 该数据块的稀疏体素 (已合并重复键)
+    """
+    lim = np.deg2rad(JOINT_LIMITS_DEG if limits_deg is None else limits_deg)
+    rng = np.random.default_rng([seed, chunk])
+    q = rng.uniform(lim[:, 0], lim[:, 1], (size, 6))
+
+    T = forward_kinematics_batch(q, dh)
+    keys = pack_voxel_keys(np.floor(T[:, :3, 3] / voxel))
+    masks = np.left_shift(np.uint64(1), orientation_bins(T[:, :3, 2]).astype(np.uint64))
+    return _reduce_voxels(keys, np.ones(size, dtype=np.int64), masks)
+
+
+class WorkspaceGrid:
+    """
+    稀疏体素工作空间: 只保存被访问过的体素 (按键升序), 每个体素记录
+    命中次数和末端接近方向覆盖的位掩码
+    """
+
+    def __init__(self, voxel=10.0):
+        self.voxel = float(voxel)
+        self.keys = np.empty(0, dtype=np.int64)
+        self.counts = np.empty(0, dtype=np.int64)
+        self.masks = np.empty(0, dtype=np.uint64)
+        self.n_samples = 0
+
+    def merge(self, keys, counts, masks):
+        """并入一个数据块的稀疏体素"""
+        self.keys, self.counts, self.masks = _reduce_voxels(
+            np.concatenate([self.keys, keys]),
+            np.concatenate([self.counts, counts]),
+            np.concatenate([self.masks, masks]))
+        self.n_samples += int(np.sum(counts))
+
+    @property
+    def n_voxels(self):
+        return len(self.keys)
+
+    def volume(self):
+        """已访问体素的总体积 (m³)"""
+        return self.n_voxels * (self.voxel * 1e-3) ** 3
+
+    def volume_estimate(self, confidence=0.95):
+        """
+        用 Chao1 物种数估计量推断体素总数 (含尚未采到的边界体素)
+
+        只被命中 1 次 / 2 次的体素数 f1, f2 反映了稀有体素还有多少没被发现,
+        置信区间按 Chao1 方差的正态近似计算
+
+        参数:
+            confidence: 置信水平
+
+        返回:
+            estimate: 估计的可达体积 (m³)
+            upper: 置信上界 (m³)
+            rel_gap: (上界 - 已访问体积) / 已访问体积
+        """
+        f1 = int(np.count_nonzero(self.counts == 1))
+        f2 = int(np.count_nonzero(self.counts == 2))
+        s_obs = self.n_voxels
+        if f2 > 0:
+            r = f1 / f2
+            s_est = s_obs + f1 * r / 2
+            var = f2 * (r ** 4 / 4 + r ** 3 + r ** 2 / 2)
+        else:
+            s_est = s_obs + f1 * (f1 - 1) / 2
+            var = f1 * (f1 - 1) / 2 + f1 * (2 * f1 - 1) ** 2 / 4
+        z = statistics.NormalDist().inv_cdf(0.5 + confidence / 2)
+        s_up = s_est + z * np.sqrt(max(var, 0.0))
+
+        v = (self.voxel * 1e-3) ** 3
+        return s_est * v, s_up * v, (s_up - s_obs) / max(s_obs, 1)
+
+    def orientation_coverage(self):
+        """每个体素覆盖的接近方向比例 (0 ~ 1)"""
+        bits = np.unpackbits(self.masks.view(np.uint8).reshape(-1, 8), axis=1)
+        return np.sum(bits, axis=1) / N_ORIENT_BINS
+
+    def dexterous_volume(self, min_coverage=0.5):
+        """接近方向覆盖比例不低于 min_coverage 的体素总体积 (m³)"""
+        n = int(np.count_nonzero(self.orientation_coverage() >= min_coverage))
+        return n * (self.voxel * 1e-3) ** 3
+
+    def centers(self):
+        """已访问体素的中心坐标 (N, 3) (mm)"""
+        return (unpack_voxel_keys(self.keys) + 0.5) * self.voxel
+
+    def boundary_points(self):
+        """
+        边界点云: 6 个面相邻体素中至少有一个未被访问的体素中心
+
+        返回:
+            points: (M, 3) float32 (mm)
+        """
+        is_inner = np.ones(self.n_voxels, dtype=bool)
+        for step in (1, 1 << _AXIS_BITS, 1 << (2 * _AXIS_BITS)):
+            for nb in (self.keys + step, self.keys - step):
+                idx = np.minimum(np.searchsorted(self.keys, nb), self.n_voxels - 1)
+                is_inner &= self.keys[idx] == nb
+        return self.centers()[~is_inner].astype(np.float32)
+
+    def save(self, path, meta=None):
+        """
+        保存为压缩 npz: 体素整数坐标 (int16/int32)、命中次数 (uint32)、方向掩码 (uint64) 和元数据
+
+        参数:
+            path: 文件路径 (.npz)
+            meta: 额外写入的元数据字典
+        """
+        ijk = unpack_voxel_keys(self.keys)
+        small = ijk.size == 0 or np.max(np.abs(ijk)) < np.iinfo(np.int16).max
+        info = {'voxel_mm': self.voxel, 'n_samples': self.n_samples, 'orient_bands': ORIENT_BANDS,
+                'orient_sectors': ORIENT_SECTORS}
+        info.update(meta or {})
+        np.savez_compressed(path, ijk=ijk.astype(np.int16 if small else np.int32),
+                            counts=np.minimum(self.counts, np.iinfo(np.uint32).max).astype(np.uint32),
+                            masks=self.masks, meta=json.dumps(info))
+
+    @classmethod
+    def load(cls, path):
+        """读取 save 保存的网格"""
+        with np.load(path) as data:
+            info = json.loads(str(data['meta']))
+            grid = cls(info['voxel_mm'])
+            grid.keys = pack_voxel_keys(data['ijk'])
+            grid.counts = data['counts'].astype(np.int64)
+            grid.masks = data['masks']
+        grid.n_samples = info['n_samples']
+        return grid
+
+
+def save_point_cloud_ply(path, points):
+    """把点云保存为二进制 PLY (float32 x/y/z), 可直接用 MeshLab / Open3D / CloudCompare 打开"""
+    points = np.ascontiguousarray(points, dtype='<f4')
+    header = ("ply\nformat binary_little_endian 1.0\n"
+              f"element vertex {len(points)}\n"
+              "property float x\nproperty float y\nproperty float z\nend_header\n")
+    with open(path, 'wb') as f:
+        f.write(header.encode('ascii'))
+        f.write(points.tobytes())
+
+
+def _ordered_chunks(pool, args, depth):
+    """在进程池中按编号顺序逐个取回数据块的结果, 同时保持最多 depth 个数据块在计算"""
+    args = iter(args)
+    futures = deque(pool.submit(sample_chunk, *a) for a in itertools.islice(args, depth))
+    while futures:
+        result = futures.popleft().result()
+        for a in itertools.islice(args, 1):
+            futures.append(pool.submit(sample_chunk, *a))
+        yield result
+
+
+def estimate_workspace(voxel=10.0, rel_tol=0.01, confidence=0.95, chunk=200000, workers=None,
+                       max_samples=100_000_000, seed=0, dh=None, limits_deg=None, verbose=True):
+    """
+    蒙特卡洛估计可达工作空间体积和灵巧工作空间
+
+    数据块在进程池中并行采样, 按数据块编号顺序逐个合并, 每合并一个就用 Chao1 置信上界检查收敛:
+    尚未发现的边界体素对应的体积相对已访问体积小于 rel_tol 时停止, 尚未合并的数据块直接丢弃
+
+    参数:
+        voxel: 体素边长 (mm)
+        rel_tol: 体积估计的相对收敛阈值
+        confidence: 置信水平
+        chunk: 每个数据块的样本数 (单个进程一次只持有一个数据块)
+        workers: 进程数, 默认 os.cpu_count(); 1 时在当前进程中计算
+        max_samples: 样本总数上限
+        seed: 随机种子, 相同种子和 chunk 下结果 (包括停止时的样本数) 与进程数无关
+        dh: DH 参数字典 (mm)
+        limits_deg: 关节限位 (6, 2) (度)
+        verbose: 是否打印每个数据块合并后的进度
+
+    返回:
+        grid: WorkspaceGrid
+        info: 字典 (volume, volume_est, volume_upper, rel_gap, n_samples, converged)
+    """
+    workers = workers or os.cpu_count() or 1
+    grid = WorkspaceGrid(voxel)
+    args = ((seed, i, chunk, voxel, dh, limits_deg) for i in range(-(-max_samples // chunk)))
+    pool = ProcessPoolExecutor(workers) if workers > 1 else None
+    converged = False
+    try:
+        if pool is None:
+            results = (sample_chunk(*a) for a in args)
+        else:
+            results = _ordered_chunks(pool, args, 2 * workers)
+        for r in results:
+            grid.merge(*r)
+
+            est, upper, gap = grid.volume_estimate(confidence)
+            if verbose:
+                print(f"  样本 {grid.n_samples:>11,} | 体素 {grid.n_voxels:>9,} | 体积 {grid.volume():.4f} m³ | "
+                      f"估计 {est:.4f} m³ | {confidence:.0%} 上界 {upper:.4f} m³ | 相对差 {gap:.2%}")
+            if gap < rel_tol:
+                converged = True
+                break
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+    est, upper, gap = grid.volume_estimate(confidence)
+    info = {'volume': grid.volume(), 'volume_est': est, 'volume_upper': upper, 'rel_gap': gap,
+            'n_samples': grid.n_samples, 'converged': converged}
+    return grid, info
+
+
+def verify_workspace(voxel=20.0, rel_tol=0.02, seed=0, out_dir=None):
+    """
+    验证工作空间估计:
+      1. 体素化与逐点计算一致, 键打包/解包可逆
+      2. 收敛后的体积不超过外包球体积 (半径为各连杆长度之和)
+      3. 保存/读取网格无损, 边界点云写出 PLY
+      4. 单进程与多进程的结果 (停止时的样本数和体素) 完全相同
+
+    参数:
+        voxel: 体素边长 (mm)
+        rel_tol: 体积估计的相对收敛阈值
+        seed: 随机种子
+        out_dir: 网格和点云的输出目录, 默认使用临时目录并在结束后删除
+    """
+    rng = np.random.default_rng(seed)
+    ijk = rng.integers(-5000, 5000, (1000, 3))
+    key_ok = np.array_equal(unpack_voxel_keys(pack_voxel_keys(ijk)), ijk)
+
+    keys, counts, masks = sample_chunk(seed, 0, 5000, voxel)
+    T = forward_kinematics_batch(np.random.default_rng([seed, 0]).uniform(
+        *np.deg2rad(JOINT_LIMITS_DEG).T, (5000, 6)))
+    ref = {}
+    for p, z in zip(T[:, :3, 3], T[:, :3, 2]):
+        k = tuple(int(v) for v in np.floor(p / voxel))
+        ref[k] = ref.get(k, 0) | (1 << int(orientation_bins(z[None])[0]))
+    voxel_ok = (len(ref) == len(keys) and
+                all(ref[tuple(k)] == int(m) for k, m in zip(unpack_voxel_keys(keys), masks)))
+
+    t0 = time.perf_counter()
+    grid, info = estimate_workspace(voxel=voxel, rel_tol=rel_tol, seed=seed, verbose=False)
+    elapsed = time.perf_counter() - t0
+
+    g1, i1 = estimate_workspace(voxel=voxel, rel_tol=0.1, seed=seed, workers=1, verbose=False)
+    g3, i3 = estimate_workspace(voxel=voxel, rel_tol=0.1, seed=seed, workers=3, verbose=False)
+    workers_ok = (i1['n_samples'] == i3['n_samples'] and np.array_equal(g1.keys, g3.keys)
+                  and np.array_equal(g1.counts, g3.counts) and np.array_equal(g1.masks, g3.masks))
+
+    reach = sum(DH_PARAMS[k] for k in ('a2', 'a3', 'd4', 'd5', 'd6')) * 1e-3
+    sphere = 4 / 3 * np.pi * (reach + np.sqrt(3) * voxel * 1e-3) ** 3
+    volume_ok = info['converged'] and info['volume'] < sphere
+
+    tmp = None
+    if out_dir is None:
+        tmp = tempfile.mkdtemp(prefix='zju_workspace_')
+        out_dir = tmp
+    try:
+        grid_path = os.path.join(out_dir, 'workspace_grid.npz')
+        ply_path = os.path.join(out_dir, 'workspace_boundary.ply')
+        grid.save(grid_path, {'rel_gap': info['rel_gap']})
+        grid_size = os.path.getsize(grid_path)
+        loaded = WorkspaceGrid.load(grid_path)
+        io_ok = (np.array_equal(loaded.keys, grid.keys) and np.array_equal(loaded.counts, grid.counts)
+                 and np.array_equal(loaded.masks, grid.masks))
+        boundary = grid.boundary_points()
+        save_point_cloud_ply(ply_path, boundary)
+    finally:
+        if tmp is not None:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    ok = key_ok and voxel_ok and volume_ok and io_ok and workers_ok
+    print(f"键打包可逆: {key_ok} | 体素化与逐点一致: {voxel_ok} | 保存/读取一致: {io_ok} | "
+          f"与进程数无关: {workers_ok}")
+    print(f"可达体积: {info['volume']:.4f} m³ (估计 {info['volume_est']:.4f}, 上界 {info['volume_upper']:.4f}, "
+          f"外包球 {sphere:.4f}) | 灵巧体积 (>=50% 接近方向): {grid.dexterous_volume():.4f} m³")
+    print(f"{info['n_samples']:,} 个样本, 耗时 {elapsed:.1f} s | 网格 {grid_size / 1024:.0f} KB | "
+          f"边界点 {len(boundary):,} 个 | {'✓ 通过' if ok else '✗ 失败'}")
+    return ok
+
+
+if __name__ == "__main__":
+    print("=" * 80)
+    print("ZJU-I型机械臂工作空间估计 (蒙特卡洛)")
+    print("=" * 80)
+    verify_workspace()